@@ -0,0 +1,179 @@
+"""
+Columnar Parquet archive of the transactions table, for readers that would otherwise SELECT * the whole history.
+
+    transactions_archive/account=ing/month=2021-02/part-0.parquet
+
+Each account/month partition is a single file holding at most one row per transaction id. The pipeline upserts the
+rows it has just inserted or re-categorised, rewriting only the partitions they fall in, so the archive follows the
+database by id. Build it from the whole transactions table first, with the [storage] and [archive] settings in
+luigi.cfg:
+
+    python -m transaction_classifier.archive
+
+and only then enable it:
+
+    [archive]
+    enabled=true
+    path=transactions/archive
+
+Until it has been built, readers keep using the storage backend and the pipeline does not upsert into it, since an
+archive holding only the rows loaded after it was enabled would not match the database.
+"""
+import logging
+import os
+import shutil
+
+import luigi
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+
+class archive(luigi.Config):
+    """
+    [archive] section of luigi.cfg.
+    """
+    enabled = luigi.BoolParameter(default=False)
+    path = luigi.Parameter(default='transactions_archive')
+
+
+class TransactionArchive:
+    """
+    Parquet dataset partitioned by account and month (of the transaction date).
+    """
+    # account and month are stored in the directory names, not in the files.
+    schema = pa.schema([('id', pa.string()),
+                        ('date', pa.timestamp('us')),
+                        ('trans_date', pa.timestamp('us')),
+                        ('vendor', pa.string()),
+                        ('location', pa.string()),
+                        ('amount', pa.float64()),
+                        ('category', pa.string()),
+                        ('ml', pa.int64())])
+    partitioning = ds.partitioning(pa.schema([('account', pa.string()), ('month', pa.string())]), flavor='hive')
+    # written by rebuild once the archive holds the whole table; dataset discovery skips names starting with '_'.
+    marker = '_BUILT'
+
+    def __init__(self, path):
+        self.path = path
+
+    def built(self):
+        """
+        True once rebuild has copied the whole transactions table into the archive.
+        """
+        return os.path.exists(os.path.join(self.path, self.marker))
+
+    def _partition_file(self, account, month):
+        return os.path.join(self.path, 'account={}'.format(account), 'month={}'.format(month), 'part-0.parquet')
+
+    def _to_table(self, transactions_df):
+        frame = pd.DataFrame({'id': transactions_df['id'].astype(str),
+                              'date': pd.to_datetime(transactions_df['date']),
+                              'trans_date': pd.to_datetime(transactions_df['trans_date']),
+                              'vendor': transactions_df['vendor'],
+                              'location': transactions_df['location'],
+                              'amount': pd.to_numeric(transactions_df['amount'], errors='coerce'),
+                              'category': transactions_df['category'],
+                              'ml': pd.to_numeric(transactions_df['ml'], errors='coerce').astype('Int64')})
+        return pa.Table.from_pandas(frame, schema=self.schema, preserve_index=False)
+
+    def upsert(self, transactions_df):
+        """
+        Add or replace rows by id. Only the partitions the rows fall in are rewritten.
+        :param transactions_df: rows with the transactions table columns.
+        :return: number of partitions rewritten.
+        """
+        if transactions_df.empty:
+            return 0
+        transactions_df = transactions_df.drop_duplicates('id', keep='last')
+        months = pd.to_datetime(transactions_df['date']).dt.strftime('%Y-%m')
+        n_partitions = 0
+        for (account, month), rows in transactions_df.groupby([transactions_df['account'].astype(str), months]):
+            filename = self._partition_file(account, month)
+            table = self._to_table(rows)
+            if os.path.exists(filename):
+                existing = pq.read_table(filename, schema=self.schema)
+                new_ids = set(table.column('id').to_pylist())
+                keep = pa.array([i not in new_ids for i in existing.column('id').to_pylist()], type=pa.bool_())
+                table = pa.concat_tables([existing.filter(keep), table])
+
+            os.makedirs(os.path.dirname(filename), exist_ok=True)
+            # dataset discovery skips names starting with '.', so readers never see a half-written file.
+            tmp_filename = os.path.join(os.path.dirname(filename), '.part-0.parquet.tmp')
+            pq.write_table(table, tmp_filename)
+            os.replace(tmp_filename, filename)
+            n_partitions += 1
+        return n_partitions
+
+    def rebuild(self, transactions_df):
+        """
+        Replace the whole archive with transactions_df.
+        """
+        if os.path.isdir(self.path):
+            shutil.rmtree(self.path)
+        n_partitions = self.upsert(transactions_df)
+        os.makedirs(self.path, exist_ok=True)
+        open(os.path.join(self.path, self.marker), 'w').close()
+        return n_partitions
+
+    def read(self, columns=None, accounts=None, start_month=None, end_month=None, filter=None):
+        """
+        Read the archive into a DataFrame, touching only the partitions and columns asked for.
+
+        :param columns: columns to read (account and month included), default all.
+        :param accounts: only read these accounts' partitions.
+        :param start_month: first month to read, 'YYYY-MM'.
+        :param end_month: last month to read, 'YYYY-MM'.
+        :param filter: extra pyarrow.dataset expression, e.g. ds.field('category') == 'GROCERIES'.
+        """
+        if not os.path.isdir(self.path):
+            return pd.DataFrame(columns=columns or self.schema.names + ['account', 'month'])
+
+        dataset = ds.dataset(self.path, format='parquet', schema=self.schema.append(pa.field('account', pa.string()))
+                             .append(pa.field('month', pa.string())), partitioning=self.partitioning)
+        expression = filter
+        for condition in [ds.field('account').isin(accounts) if accounts else None,
+                          ds.field('month') >= start_month if start_month else None,
+                          ds.field('month') <= end_month if end_month else None]:
+            if condition is not None:
+                expression = condition if expression is None else expression & condition
+        return dataset.to_table(columns=columns, filter=expression).to_pandas()
+
+
+def read_transactions(columns=None):
+    """
+    Read the transactions from the archive when it is enabled, otherwise from the storage backend.
+    """
+    transaction_archive = get_archive()
+    if transaction_archive is not None:
+        transactions_df = transaction_archive.read(columns=columns)
+        return transactions_df.drop(columns=['month'], errors='ignore')
+
+    from transaction_classifier.storage import get_storage
+    qry = 'SELECT {} FROM transactions;'.format(', '.join(columns) if columns else '*')
+    return get_storage().read_transactions(qry)
+
+
+def get_archive():
+    """
+    :return: TransactionArchive at the configured path, or None when the archive is disabled or has not been built
+        yet (see rebuild).
+    """
+    settings = archive()
+    if not settings.enabled:
+        return None
+    transaction_archive = TransactionArchive(settings.path)
+    if not transaction_archive.built():
+        logger.warning('Archive {} has not been built, using the storage backend instead; '
+                       'run python -m transaction_classifier.archive'.format(settings.path))
+        return None
+    return transaction_archive
+
+
+if __name__ == '__main__':
+    # python -m transaction_classifier.archive: rebuild the archive from the configured storage backend.
+    from transaction_classifier.storage import get_storage
+    TransactionArchive(archive().path).rebuild(get_storage().read_transactions())
@@ -0,0 +1,67 @@
+import os
+import random
+import string
+import tempfile
+import time
+
+from transaction_classifier.benchmarks.synthetic_data import write_categories
+from transaction_classifier.utils import TransactionClassifier
+
+
+def synthetic_vendors(classifier, n_rows=20000, hit_rate=0.7, seed=0):
+    rnd = random.Random(seed)
+    seed_words = [w for cat in classifier.categories_list for w in cat['SeedWords']]
+    vendors = []
+    for _ in range(n_rows):
+        noise = ''.join(rnd.choice(string.ascii_uppercase + ' ') for _ in range(rnd.randint(10, 25)))
+        if rnd.random() < hit_rate:
+            pos = rnd.randint(0, len(noise))
+            noise = noise[:pos] + rnd.choice(seed_words) + noise[pos:]
+        vendors.append(noise)
+    return vendors
+
+
+def naive_categorise(categories_list, transaction):
+    """
+    The original nested-loop implementation, kept here as the reference for the benchmark.
+    """
+    vendor = transaction['vendor']
+    if not vendor:
+        return None
+    vendor = vendor.upper().replace("'", '').strip()
+    for category in categories_list:
+        for seed_word in category['SeedWords']:
+            if seed_word.upper() in vendor:
+                return category['Category']
+    return None
+
+
+def main(n_categories=500, words_per_category=10, n_rows=20000):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        categories_file = os.path.join(tmp_dir, 'categories.csv')
+        write_categories(categories_file, n_categories, words_per_category)
+
+        start = time.perf_counter()
+        classifier = TransactionClassifier(categories_file, use_cache=False)
+        load_time = time.perf_counter() - start
+
+    transactions = [{'vendor': v} for v in synthetic_vendors(classifier, n_rows)]
+
+    categories_list = classifier.categories_list
+    start = time.perf_counter()
+    naive = [naive_categorise(categories_list, t) for t in transactions]
+    naive_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    compiled = [classifier.categorise_transaction(t) for t in transactions]
+    compiled_time = time.perf_counter() - start
+
+    assert naive == compiled, 'compiled matcher disagrees with the nested loop'
+
+    print('{} seed words, {} rows (load {:.3f}s)'.format(n_categories * words_per_category, n_rows, load_time))
+    print('nested loop: {:>12,.0f} rows/s'.format(n_rows / naive_time))
+    print('automaton:   {:>12,.0f} rows/s'.format(n_rows / compiled_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""
+Peak memory of the classifier's feature matrix, dense (the former toarray/concatenate path) against sparse (featurise).
+
+    python -m transaction_classifier.benchmarks.bench_features --rows 100000 1000000 --trees 10
+
+Each measurement runs in its own process and reports the size of the matrix and how far the peak resident memory rose
+above the memory already used by the synthetic transactions: once after building the feature matrix and once after
+fitting a forest of --trees trees on it. A dense matrix that would not fit in --max-dense-gb is estimated instead of
+built. Peak memory is read from /proc, so this runs on Linux only.
+"""
+import argparse
+import multiprocessing
+import time
+
+import numpy as np
+
+from transaction_classifier.benchmarks.synthetic_data import transactions_frame
+from transaction_classifier.expense_categoriser_ml import (prepare_transactions, fit_vectorisers, featurise,
+                                                           text_columns, TEXT_COLUMNS)
+
+
+def dense_features(transactions_df, vectorisers):
+    """
+    The feature matrix as train_model used to build it.
+    """
+    day_of_week = np.array([date.weekday() for date in transactions_df['trans_date'].to_list()])[:, None]
+    amount = transactions_df['amount'].to_numpy()[:, None]
+    vectors = [vectorisers[column].transform(text).toarray()
+               for column, text in zip(TEXT_COLUMNS, text_columns(transactions_df))]
+    return np.concatenate([amount, day_of_week] + vectors, axis=1)
+
+
+def _status_mb(field):
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith(field + ':'):
+                return int(line.split()[1]) / 1024
+
+
+def reset_peak():
+    """
+    Reset the peak resident memory (VmHWM) to the current one, Linux only.
+    :return: current resident memory in MB.
+    """
+    with open('/proc/self/clear_refs', 'w') as clear_refs:
+        clear_refs.write('5')
+    return _status_mb('VmRSS')
+
+
+def peak_mb():
+    return _status_mb('VmHWM')
+
+
+def measure(n_rows, mode, n_trees, results):
+    from sklearn.ensemble import RandomForestClassifier
+
+    labelled_df = prepare_transactions(transactions_frame(n_rows)).dropna(subset=['category'])
+    vectorisers = fit_vectorisers(labelled_df)
+    codes = labelled_df['category'].astype('category').cat.codes.to_numpy()
+    baseline = reset_peak()
+
+    start = time.perf_counter()
+    vector = dense_features(labelled_df, vectorisers) if mode == 'dense' else featurise(labelled_df, vectorisers)
+    results['features_seconds'] = time.perf_counter() - start
+    results['features_mb'] = peak_mb() - baseline
+    results['shape'] = vector.shape
+    results['matrix_mb'] = (vector.nbytes if mode == 'dense' else
+                            vector.data.nbytes + vector.indices.nbytes + vector.indptr.nbytes) / 2 ** 20
+
+    if n_trees:
+        start = time.perf_counter()
+        RandomForestClassifier(n_estimators=n_trees, random_state=0).fit(vector, codes)
+        results['fit_seconds'] = time.perf_counter() - start
+        results['fit_mb'] = peak_mb() - baseline
+
+
+def run(n_rows, mode, n_trees):
+    context = multiprocessing.get_context('spawn')
+    with context.Manager() as manager:
+        results = manager.dict()
+        process = context.Process(target=measure, args=(n_rows, mode, n_trees, results))
+        process.start()
+        process.join()
+        return dict(results)
+
+
+def n_features(n_rows):
+    labelled_df = prepare_transactions(transactions_frame(n_rows)).dropna(subset=['category'])
+    vectorisers = fit_vectorisers(labelled_df)
+    return len(labelled_df), 2 + sum(len(vectoriser.vocabulary_) for vectoriser in vectorisers.values())
+
+
+def main(row_counts=(100000, 1000000), n_trees=10, max_dense_gb=2.0):
+    for n_rows in row_counts:
+        n_labelled, n_columns = n_features(n_rows)
+        # float64 matrix plus the float32 copy the forest makes of it.
+        dense_estimate_mb = n_labelled * n_columns * 12 / 2 ** 20
+        for mode in ['dense', 'sparse']:
+            if mode == 'dense' and dense_estimate_mb > max_dense_gb * 1024:
+                print('{:>10,} rows {:>6}: {:,} x {} matrix, about {:,.0f} MB (estimated, not built)'.format(
+                    n_rows, mode, n_labelled, n_columns, dense_estimate_mb))
+                continue
+            results = run(n_rows, mode, n_trees)
+            line = '{:>10,} rows {:>6}: matrix {:>7,.0f} MB, features peak {:>7,.0f} MB in {:.2f}s'.format(
+                n_rows, mode, results['matrix_mb'], results['features_mb'], results['features_seconds'])
+            if n_trees:
+                line += ', fit {} trees peak {:>7,.0f} MB in {:.1f}s'.format(n_trees, results['fit_mb'],
+                                                                          results['fit_seconds'])
+            print(line)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark dense and sparse feature matrices for the classifier.')
+    parser.add_argument('--rows', type=int, nargs='+', default=[100000, 1000000])
+    parser.add_argument('--trees', type=int, default=10, help='trees to fit on the matrix, 0 to skip fitting')
+    parser.add_argument('--max-dense-gb', type=float, default=2.0)
+    args = parser.parse_args()
+    main(args.rows, args.trees, args.max_dense_gb)
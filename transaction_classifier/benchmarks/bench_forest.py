@@ -0,0 +1,36 @@
+"""
+The 'fixed' and 'budget' training modes of expense_categoriser_ml: a 1000-tree forest against one grown in steps
+until its time budget is used or its held-out accuracy stops improving.
+
+    python -m transaction_classifier.benchmarks.bench_forest --rows 20000 --budget 60 --n-jobs -1
+
+Prints the accuracy / trees / time curve of the budgeted forest as it is stored in the model metadata.
+"""
+import argparse
+import os
+
+from transaction_classifier.benchmarks.synthetic_data import transactions_frame
+from transaction_classifier.expense_categoriser_ml import prepare_transactions, fit_model
+
+
+def main(n_rows=20000, time_budget=60, n_jobs=-1, tree_step=50):
+    labelled_df = prepare_transactions(transactions_frame(n_rows)).dropna(subset=['category'])
+    print('{:,} labelled transactions, {} cores, n_jobs={}'.format(len(labelled_df), os.cpu_count(), n_jobs))
+
+    budget = {'time_budget': time_budget, 'tree_step': tree_step}
+    model, metadata = fit_model(labelled_df, n_jobs=n_jobs, budget=budget)
+    for point in metadata['curve']:
+        print('budget: {trees:>5} trees {seconds:>8.1f}s accuracy {accuracy:.4f}'.format(**point))
+
+    model, fixed = fit_model(labelled_df, n_jobs=n_jobs)
+    print('fixed:  {trees:>5} trees {seconds:>8.1f}s accuracy {accuracy:.4f}'.format(**fixed['curve'][0]))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the fixed and time-budgeted forest training modes.')
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--budget', type=float, default=60)
+    parser.add_argument('--n-jobs', type=int, default=-1)
+    parser.add_argument('--tree-step', type=int, default=50)
+    args = parser.parse_args()
+    main(args.rows, args.budget, args.n_jobs, args.tree_step)
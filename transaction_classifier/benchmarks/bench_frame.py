@@ -0,0 +1,40 @@
+import tempfile
+import time
+
+from transaction_classifier.benchmarks.synthetic_data import write_dataset
+from transaction_classifier.utils import IngUtils, NabUtils, PaypalUtils, frame_rows
+
+BANKS = {'ing': IngUtils, 'nab': NabUtils, 'paypal': PaypalUtils}
+
+
+def row_path(utils, filename):
+    for raw_transaction in utils.read_rows(filename):
+        transaction = utils.format_transaction(raw_transaction)
+        if utils.validate_transaction(transaction):
+            yield tuple([v for k, v in transaction.items()])
+
+
+def frame_path(utils, filename):
+    transactions_df = utils.format_frame(utils.read_frame(filename))
+    return frame_rows(transactions_df[utils.validate_frame(transactions_df)])
+
+
+def main(n_rows=200000):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        files = write_dataset(tmp_dir, n_rows)
+        print('{} rows'.format(n_rows))
+        for bank, utils_cls in BANKS.items():
+            start = time.perf_counter()
+            expected = list(row_path(utils_cls(categories=files['categories']), files[bank]))
+            row_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            rows = list(frame_path(utils_cls(categories=files['categories']), files[bank]))
+            frame_time = time.perf_counter() - start
+            assert rows == expected, '{} frame rows differ from the row path'.format(bank)
+            print('{:>7} rows: {:>12,.0f} rows/s, frame: {:>12,.0f} rows/s ({:.2f}x)'.format(
+                bank, n_rows / row_time, n_rows / frame_time, row_time / frame_time))
+
+
+if __name__ == '__main__':
+    main()
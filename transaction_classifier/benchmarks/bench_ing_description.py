@@ -0,0 +1,82 @@
+import random
+import re
+import time
+
+from transaction_classifier.utils import IngUtils
+
+
+# Descriptions in the shapes that appear in ING exports.
+ING_DESCRIPTIONS = [
+    'COLES 0810 - Visa Purchase - Receipt 145391In GEELONG Date 04 Jun 2020 Card 462263xxxxxx8524',
+    '7-ELEVEN 2135 - Visa Purchase - Receipt 104470In MELBOURNE Date 27 May 2020 Card 462263xxxxxx8524',
+    'BP EXPRESS - EFTPOS Purchase - Receipt 302144Date 02 Jun 2020 Time 10:42AM Card 462263xxxxxx8524',
+    'Netflix.com - Visa Purchase - Receipt 192833In Los Gatos Date 30 May 2020 Card 462263xxxxxx8524',
+    'Internal Transfer - Receipt 640117 To 12345678',
+    'Salary Deposit - Receipt 772012 From EMPLOYER PTY LTD',
+    'Transfer - Receipt 553210 To P Matho',
+    'ATM Owner Fee Rebate',
+    'Interest Credit',
+    'AMAZON AU MARKETP-Visa Purchase - Receipt 133981In SYDNEY SOUTH Date 01 Jun 2020 Card 462263xxxxxx8524',
+    'PAYPAL *EBAY AU - Visa Purchase - Receipt 129341In 4029357733 Date 18 May 2020 Card 462263xxxxxx8524',
+    'Direct Debit - Receipt 118823 Telstra Corp Ltd',
+]
+
+
+def legacy_parse_ing_description(description):
+    """
+    The original implementation, kept here as the reference for the benchmark.
+    """
+    def get_string(regex, text):
+        pattern = re.compile(regex)
+        try:
+            return pattern.search(text).group()
+        except:
+            return None
+
+    desc_ret = description
+    for d_string in ['7-', 'P-']:
+        idx = description.find(d_string)
+        if idx > -1:
+            desc_list = list(description)
+            desc_list[idx + 1] = ' '
+            desc_ret = "".join(desc_list)
+
+    return {k: get_string(v, desc_ret) for (k, v) in IngUtils.ing_desc_regex.items()}
+
+
+def fuzzed_descriptions(n=20000, seed=0):
+    """
+    Random strings built from the markers the parser looks for, to exercise orderings real exports rarely show.
+    """
+    rnd = random.Random(seed)
+    pieces = ['-', ' - ', 'Receipt', 'In', 'To', 'Date', 'Card', 'Time', '7-', 'P-', 'Inc', 'Tom', ' 123 ', 'AB', '']
+    return [''.join(rnd.choice(pieces) for _ in range(rnd.randint(0, 12))) for _ in range(n)]
+
+
+def main(n_rows=50000):
+    ing = IngUtils.__new__(IngUtils)
+
+    for description in ING_DESCRIPTIONS + fuzzed_descriptions():
+        expected = legacy_parse_ing_description(description)
+        actual = ing.parse_ing_description(description)
+        assert actual == expected, (description, actual, expected)
+
+    descriptions = [ING_DESCRIPTIONS[i % len(ING_DESCRIPTIONS)] for i in range(n_rows)]
+
+    start = time.perf_counter()
+    for description in descriptions:
+        legacy_parse_ing_description(description)
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for description in descriptions:
+        ing.parse_ing_description(description)
+    single_pass_time = time.perf_counter() - start
+
+    print('{} descriptions'.format(n_rows))
+    print('regex per field: {:>12,.0f} rows/s'.format(n_rows / legacy_time))
+    print('single pass:     {:>12,.0f} rows/s'.format(n_rows / single_pass_time))
+
+
+if __name__ == '__main__':
+    main()
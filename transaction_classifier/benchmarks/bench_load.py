@@ -0,0 +1,109 @@
+"""
+Compare the executemany and staged-file load strategies of BaseTransactionProcessor.copy.
+
+    python -m transaction_classifier.benchmarks.bench_load --rows 100000 1000000
+
+SQLite is always benchmarked (executemany vs sqlite_load_file). With --mysql the same rows are also loaded into a
+scratch table on a local MySQL server (executemany vs LOAD DATA LOCAL INFILE).
+"""
+import argparse
+import datetime
+import hashlib
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from transaction_classifier.benchmarks.synthetic_data import vendor_pool, LOCATIONS, CATEGORIES
+from transaction_classifier.loaders import executemany_load, mysql_load_data, sqlite_load_file
+
+COLUMNS = ['id', 'date', 'trans_date', 'vendor', 'location', 'amount', 'account', 'category', 'ml']
+
+
+def formatted_rows(n_rows, seed=0):
+    """
+    Rows shaped like the output of BaseTransactionProcessor.rows, including NULLs and characters that need escaping.
+    """
+    rnd = random.Random(seed)
+    vendors = vendor_pool(seed=seed) + ["MCDONALD'S", 'TAB\tVENDOR', 'BACK\\SLASH', '中文商店']
+    end = datetime.datetime(2021, 2, 14)
+    for i in range(n_rows):
+        date = end - datetime.timedelta(days=i // 300)
+        yield (hashlib.md5(str(i).encode()).hexdigest(), date, date if rnd.random() < 0.7 else None,
+               rnd.choice(vendors), rnd.choice(LOCATIONS) if rnd.random() < 0.5 else None,
+               round(rnd.uniform(-500, 500), 2), 'ing', rnd.choice(CATEGORIES) if rnd.random() < 0.8 else None, 0)
+
+
+def sqlite_loaders():
+    def executemany(connection, rows):
+        return executemany_load(connection, 'new_transactions', COLUMNS, rows, bulk_size=10000, placeholder='?')
+
+    def load_file(connection, rows):
+        return sqlite_load_file(connection, 'new_transactions', COLUMNS, rows)
+
+    return {'executemany': executemany, 'load_file': load_file}
+
+
+def bench_sqlite(n_rows, tmp_dir):
+    results = {}
+    for name, load in sqlite_loaders().items():
+        db_file = os.path.join(tmp_dir, '{}.db'.format(name))
+        connection = sqlite3.connect(db_file)
+        connection.execute('CREATE TABLE new_transactions (id TEXT, date TEXT, trans_date TEXT, vendor TEXT, '
+                           'location TEXT, amount REAL, account TEXT, category TEXT, ml INTEGER)')
+        rows = list(formatted_rows(n_rows))
+        start = time.perf_counter()
+        load(connection, rows)
+        connection.commit()
+        results[name] = time.perf_counter() - start
+        assert connection.execute('SELECT COUNT(*) FROM new_transactions').fetchone()[0] == n_rows
+        connection.close()
+        os.remove(db_file)
+    return results
+
+
+def bench_mysql(n_rows, host='localhost', user='root', password='', database='banking_db'):
+    import mysql.connector
+
+    connection = mysql.connector.connect(host=host, user=user, password=password, database=database,
+                                         allow_local_infile=True)
+    loaders = {'executemany': lambda rows: executemany_load(connection, 'bench_new_transactions', COLUMNS, rows),
+               'load_data': lambda rows: mysql_load_data(connection, 'bench_new_transactions', COLUMNS, rows)}
+    results = {}
+    try:
+        cursor = connection.cursor()
+        cursor.execute('CREATE TABLE IF NOT EXISTS bench_new_transactions LIKE new_transactions')
+        for name, load in loaders.items():
+            cursor.execute('TRUNCATE bench_new_transactions')
+            rows = list(formatted_rows(n_rows))
+            start = time.perf_counter()
+            load(rows)
+            connection.commit()
+            results[name] = time.perf_counter() - start
+        cursor.execute('DROP TABLE bench_new_transactions')
+    finally:
+        connection.close()
+    return results
+
+
+def report(backend, n_rows, results, baseline='executemany'):
+    for name, elapsed in results.items():
+        print('{:>7} {:>10,} rows {:>12}: {:>12,.0f} rows/s ({:.2f}x)'.format(
+            backend, n_rows, name, n_rows / elapsed, results[baseline] / elapsed))
+
+
+def main(row_counts=(100000, 1000000), mysql=False):
+    for n_rows in row_counts:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            report('sqlite', n_rows, bench_sqlite(n_rows, tmp_dir))
+        if mysql:
+            report('mysql', n_rows, bench_mysql(n_rows))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the executemany and staged-file load strategies.')
+    parser.add_argument('--rows', type=int, nargs='+', default=[100000, 1000000])
+    parser.add_argument('--mysql', action='store_true', help='also benchmark against a local MySQL banking_db')
+    args = parser.parse_args()
+    main(args.rows, args.mysql)
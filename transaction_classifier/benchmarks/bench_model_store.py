@@ -0,0 +1,62 @@
+"""
+Cold and warm start of expense_categoriser_ml.train_model with a ModelStore.
+
+    python -m transaction_classifier.benchmarks.bench_model_store --rows 20000
+
+The cold start fits and saves the model, the warm start finds the same labelled transactions in the store and only
+loads the model and predicts. So does a run after some of the predictions were written back (ml=1), since they are
+not part of the key. A last run with one more labelled transaction shows that any other change retrains.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from transaction_classifier.benchmarks.synthetic_data import transactions_frame
+from transaction_classifier.expense_categoriser_ml import train_model
+from transaction_classifier.model_store import ModelStore
+
+
+def timed_train(transactions_df, store):
+    start = time.perf_counter()
+    uncat_df = train_model(transactions_df.copy(), store)
+    return time.perf_counter() - start, uncat_df
+
+
+def main(n_rows=20000):
+    transactions_df = transactions_frame(n_rows)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = ModelStore(os.path.join(tmp_dir, 'models'))
+        cold, cold_df = timed_train(transactions_df, store)
+        warm, warm_df = timed_train(transactions_df, store)
+        assert (cold_df['category'].to_numpy() == warm_df['category'].to_numpy()).all()
+
+        # the next pipeline run: half of the predictions have been written back, the other half is still new.
+        uncategorised = transactions_df['category'].isnull()
+        written_back_df = transactions_df.assign(ml=uncategorised.astype(int))
+        written_back = written_back_df.index[uncategorised][::2]
+        written_back_df.loc[written_back, 'category'] = written_back_df.loc[written_back, 'id'].map(
+            dict(zip(cold_df['id'], cold_df['category'])))
+        n_versions = len(store.versions())
+        next_run, _ = timed_train(written_back_df, store)
+        assert len(store.versions()) == n_versions, 'written back predictions must not retrain the model'
+
+        relabelled_df = transactions_df.copy()
+        relabelled_df.loc[relabelled_df['category'].isnull().idxmax(), 'category'] = 'GROCERIES'
+        changed, _ = timed_train(relabelled_df, store)
+
+        key = store.latest()
+        size = os.path.getsize(os.path.join(store.path, key, 'model.joblib'))
+        print('{:,} transactions, model {} ({:.1f} MB), {} versions stored'.format(n_rows, key, size / 2 ** 20,
+                                                                                len(store.versions())))
+    print('cold start {:>8.2f}s'.format(cold))
+    print('warm start {:>8.2f}s ({:.0f}x)'.format(warm, cold / warm))
+    print('next run   {:>8.2f}s ({:.0f}x)'.format(next_run, cold / next_run))
+    print('relabelled {:>8.2f}s'.format(changed))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark cold and warm starts of train_model with a ModelStore.')
+    parser.add_argument('--rows', type=int, default=20000)
+    args = parser.parse_args()
+    main(args.rows)
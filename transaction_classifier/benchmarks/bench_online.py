@@ -0,0 +1,60 @@
+"""
+The online learner of expense_categoriser_ml against refitting the random forest, over a series of pipeline runs that
+each label a few more transactions.
+
+    python -m transaction_classifier.benchmarks.bench_online --rows 20000 --runs 5
+
+The first run trains the online model on the labelled history. Each later run labels --batch more transactions (one
+of them introduces a new category) and only those are learnt. The random forest is refitted once on the final
+labelled set, which is what every run costs it. Both are scored on the same held-out transactions.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from sklearn.metrics import accuracy_score
+
+from transaction_classifier.benchmarks.synthetic_data import transactions_frame
+from transaction_classifier.expense_categoriser_ml import (prepare_transactions, fit_model, update_online_model,
+                                                           predict_categories)
+from transaction_classifier.model_store import ModelStore
+
+
+def main(n_rows=20000, n_runs=5, batch=1000, seed=0):
+    labelled_df = prepare_transactions(transactions_frame(n_rows, seed=seed)).dropna(subset=['category'])
+    labelled_df = labelled_df.sample(frac=1, random_state=seed).reset_index(drop=True)
+    test_df, labelled_df = labelled_df[:len(labelled_df) // 10], labelled_df[len(labelled_df) // 10:]
+    n_history = len(labelled_df) - n_runs * batch
+    # a category nobody used before shows up in the second run:
+    new_category = labelled_df.index[n_history + batch:n_history + batch + 20]
+    labelled_df.loc[new_category, 'category'] = 'PETS'
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = ModelStore(os.path.join(tmp_dir, 'models'))
+        for run in range(n_runs + 1):
+            start = time.perf_counter()
+            model = update_online_model(labelled_df[:n_history + run * batch], store)
+            print('online run {}: {:>6,} labelled, {:>6.2f}s'.format(run, n_history + run * batch,
+                                                                     time.perf_counter() - start))
+        online_accuracy = accuracy_score(test_df['category'], predict_categories(model, test_df))
+        print('online model: {} categories, {:.1f} MB stored'.format(
+            len(model['categories']), sum(os.path.getsize(os.path.join(root, name))
+                                          for root, _, names in os.walk(store.path) for name in names) / 2 ** 20))
+
+    start = time.perf_counter()
+    forest, metadata = fit_model(labelled_df)
+    forest_seconds = time.perf_counter() - start
+    forest_accuracy = accuracy_score(test_df['category'], predict_categories(forest, test_df))
+
+    print('held-out accuracy: online {:.4f}, random forest {:.4f}'.format(online_accuracy, forest_accuracy))
+    print('random forest refit every run: {:.2f}s'.format(forest_seconds))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the online learner against refitting the random forest.')
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--batch', type=int, default=1000)
+    args = parser.parse_args()
+    main(args.rows, args.runs, args.batch)
@@ -0,0 +1,42 @@
+import os
+import tempfile
+import time
+
+from transaction_classifier.benchmarks.synthetic_data import write_dataset
+from transaction_classifier.parallel import parallel_rows
+from transaction_classifier.utils import IngUtils
+
+
+def serial_rows(utils_kwargs, filename):
+    ing = IngUtils(**utils_kwargs)
+    for raw_transaction in ing.read_rows(filename):
+        transaction = ing.format_transaction(raw_transaction)
+        if ing.validate_transaction(transaction):
+            yield tuple([v for k, v in transaction.items()])
+
+
+def main(n_rows=200000, max_workers=None):
+    max_workers = max_workers or os.cpu_count()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        files = write_dataset(tmp_dir, n_rows)
+        export_file = files['ing']
+        utils_kwargs = {'categories': files['categories']}
+
+        start = time.perf_counter()
+        expected = list(serial_rows(utils_kwargs, export_file))
+        serial_time = time.perf_counter() - start
+        print('{} rows'.format(n_rows))
+        print('serial:    {:>12,.0f} rows/s'.format(n_rows / serial_time))
+
+        workers = 1
+        while workers <= max_workers:
+            start = time.perf_counter()
+            rows = list(parallel_rows(IngUtils, utils_kwargs, export_file, workers))
+            elapsed = time.perf_counter() - start
+            assert rows == expected, 'parallel rows differ from the serial path'
+            print('{:>2} workers: {:>12,.0f} rows/s ({:.2f}x)'.format(workers, n_rows / elapsed, serial_time / elapsed))
+            workers *= 2
+
+
+if __name__ == '__main__':
+    main()
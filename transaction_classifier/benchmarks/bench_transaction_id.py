@@ -0,0 +1,89 @@
+import csv
+import hashlib
+import json
+import os
+import random
+import tempfile
+import time
+
+import pandas as pd
+
+from transaction_classifier.benchmarks.synthetic_data import write_dataset
+from transaction_classifier.utils import NabUtils, TransactionIdEngine
+
+
+def synthetic_export(n_rows=100000, seed=0):
+    """
+    Raw ING-shaped rows as import_csv_frame reads them: every field a string, empty fields as ''.
+    """
+    rnd = random.Random(seed)
+    return pd.DataFrame({
+        'Date': ['{:02d}/{:02d}/2020'.format(rnd.randint(1, 28), rnd.randint(1, 12)) for _ in range(n_rows)],
+        'Description': ['VENDOR {} - Visa Purchase - Receipt {}In SYDNEY Date 04 Jun 2020 Card 462263xxxxxx8524'.format(
+            rnd.randint(0, 500), rnd.randint(100000, 999999)) for _ in range(n_rows)],
+        'Credit': [rnd.choice(['', '1,234.50']) for _ in range(n_rows)],
+        'Debit': [rnd.choice(['', '-12.30']) for _ in range(n_rows)],
+        'Balance': ['{:.2f}'.format(rnd.uniform(0, 10000)) for _ in range(n_rows)],
+    })
+
+
+def rewritten_nab_ids(nab, filename):
+    """
+    Ids of a NAB export as they were hashed when create_header rewrote it with pd.read_csv(...).to_csv(...), which
+    read the first transaction as the header and dropped it.
+    """
+    nab_df = pd.read_csv(filename)
+    nab_df.columns = nab.header
+    rewritten = filename + '.rewritten'
+    nab_df.to_csv(rewritten, index=False)
+    with open(rewritten) as csv_file:
+        return [nab.calc_transaction_id(raw_transaction) for raw_transaction in csv.DictReader(csv_file)]
+
+
+def check_nab_ids(n_rows=20000):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        files = write_dataset(tmp_dir, n_rows)
+        nab = NabUtils(categories=files['categories'])
+        # a first row that would make the Balance column float if it took part in the type inference:
+        first_row = '14-Feb-21,-12.00,,,EFTPOS,COLES 0810,100.5\n'
+        samples = [files['nab'], os.path.join(tmp_dir, 'first_row.csv')]
+        with open(samples[1], 'w') as csv_file:
+            csv_file.write(first_row + '13-Feb-21,-3.50,,,VISA,BP 0001,12\n12-Feb-21,-4.00,,,VISA,BP 0002,13\n')
+
+        for filename in samples:
+            expected = rewritten_nab_ids(nab, filename)
+            row_ids = [nab.calc_transaction_id(raw_transaction) for raw_transaction in nab.read_rows(filename)]
+            assert row_ids[1:] == expected, 'NAB ids differ from the rewritten export'
+            assert nab.id_engine.frame_ids(nab.read_frame(filename)) == row_ids
+
+
+def main(n_rows=100000):
+    raw_df = synthetic_export(n_rows)
+    records = raw_df.to_dict('records')
+
+    start = time.perf_counter()
+    reference = [hashlib.md5(json.dumps(row, sort_keys=True).encode('utf-8')).hexdigest() for row in records]
+    reference_time = time.perf_counter() - start
+
+    legacy = TransactionIdEngine('legacy')
+    start = time.perf_counter()
+    legacy_ids = legacy.frame_ids(raw_df)
+    legacy_time = time.perf_counter() - start
+    assert legacy_ids == reference, 'legacy mode must reproduce the existing ids'
+    assert [legacy.row_id(row) for row in records[:1000]] == reference[:1000]
+
+    native = TransactionIdEngine('native')
+    start = time.perf_counter()
+    native_ids = native.frame_ids(raw_df)
+    native_time = time.perf_counter() - start
+    assert native_ids[:1000] == [native.row_id(row) for row in records[:1000]]
+    check_nab_ids()
+
+    print('{} rows'.format(n_rows))
+    print('json.dumps + md5 per row: {:>12,.0f} rows/s'.format(n_rows / reference_time))
+    print('legacy block:             {:>12,.0f} rows/s'.format(n_rows / legacy_time))
+    print('native block:             {:>12,.0f} rows/s'.format(n_rows / native_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Compare the category write-back of ClassifyUnknownTransactions: the whole predicted frame through to_sql and an
+UPDATE join, against only the (id, category) pairs.
+
+    python -m transaction_classifier.benchmarks.bench_writeback --rows 100000 1000000
+
+Runs on an SQLite database in a temporary directory, with about 20% of the transactions uncategorised.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from transaction_classifier.benchmarks.bench_load import COLUMNS, formatted_rows
+from transaction_classifier.benchmarks.synthetic_data import CATEGORIES
+from transaction_classifier.loaders import executemany_load
+from transaction_classifier.storage import SqliteStorage, write_back_categories
+
+
+def full_frame(backend, connection, table, predicted_df, transactions_df):
+    predicted_df.to_sql(table, con=backend.engine(), if_exists='append', index=False)
+    return backend.update_categories(table)
+
+
+def pairs(strategy):
+    def write_back(backend, connection, table, predicted_df, transactions_df):
+        return write_back_categories(backend, connection, table, predicted_df, strategy)
+    return write_back
+
+
+WRITE_BACKS = {'full_frame': full_frame,
+               'pairs_executemany': pairs('executemany'),
+               'pairs_load_data': pairs('load_data')}
+
+
+def bench(n_rows, tmp_dir, seed=0):
+    backend = SqliteStorage(os.path.join(tmp_dir, 'writeback.db'))
+    connection = backend.connect()
+    executemany_load(connection, 'transactions', COLUMNS, formatted_rows(n_rows, seed), placeholder='?')
+    connection.commit()
+
+    transactions_df = backend.read_transactions()
+    rnd = random.Random(seed)
+    predicted_df = transactions_df[transactions_df['category'].isnull()].copy()
+    predicted_df['category'] = [rnd.choice(CATEGORIES) for _ in range(len(predicted_df))]
+
+    results = {}
+    for name, write_back in WRITE_BACKS.items():
+        backend.create_staging(connection, 'bench_staging')
+        start = time.perf_counter()
+        n_updated = write_back(backend, connection, 'bench_staging', predicted_df, transactions_df)
+        results[name] = time.perf_counter() - start
+        assert n_updated == len(predicted_df)
+        backend.drop_staging(connection, 'bench_staging')
+    connection.close()
+    backend.engine().dispose()
+    return len(predicted_df), results
+
+
+def report(n_rows, n_predicted, results, baseline='full_frame'):
+    for name, elapsed in results.items():
+        print('{:>10,} rows {:>9,} predicted {:>18}: {:>7.2f}s ({:.2f}x)'.format(
+            n_rows, n_predicted, name, elapsed, results[baseline] / elapsed))
+
+
+def main(row_counts=(100000, 1000000)):
+    for n_rows in row_counts:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            report(n_rows, *bench(n_rows, tmp_dir))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the category write-back of ClassifyUnknownTransactions.')
+    parser.add_argument('--rows', type=int, nargs='+', default=[100000, 1000000])
+    args = parser.parse_args()
+    main(args.rows)
@@ -0,0 +1,176 @@
+"""
+Repeatable ingest benchmark for IngUtils, NabUtils, PaypalUtils and TransactionClassifier.
+
+    python -m transaction_classifier.benchmarks.harness --rows 100000 10000000
+
+For each export it reports end-to-end rows/s, peak python memory and the time spent in each stage (parse, id, date,
+categorise, validate). Results are written as JSON under benchmark_results/, named after the commit, so runs on
+different commits can be compared.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from itertools import islice
+
+from transaction_classifier.benchmarks.synthetic_data import write_dataset
+from transaction_classifier.utils import IngUtils, NabUtils, PaypalUtils
+
+STAGES = ['parse', 'id', 'date', 'categorise', 'validate']
+
+
+def _ing_stages(ing):
+    def parse(raw_transaction):
+        return ing.parse_ing_description(raw_transaction['Description'])
+
+    def date(raw_transaction, parsed):
+        ing.date_parser.parse(raw_transaction['Date'])
+        if parsed['trans_date']:
+            ing.trans_date_parser.parse(parsed['trans_date'])
+
+    return parse, date, lambda raw_transaction, parsed: parsed['vendor']
+
+
+def _nab_stages(nab):
+    return (lambda raw_transaction: None,
+            lambda raw_transaction, parsed: nab.date_parser.parse(raw_transaction['Date']),
+            lambda raw_transaction, parsed: raw_transaction['Vendor'])
+
+
+def _paypal_stages(paypal):
+    return (lambda raw_transaction: None,
+            lambda raw_transaction, parsed: paypal.date_parser.parse(raw_transaction['Date']),
+            lambda raw_transaction, parsed: raw_transaction['Name'])
+
+
+BANKS = {'ing': (IngUtils, _ing_stages),
+         'nab': (NabUtils, _nab_stages),
+         'paypal': (PaypalUtils, _paypal_stages)}
+
+
+def run_end_to_end(utils, filename):
+    """
+    The row-by-row path of BaseTransactionProcessor.rows.
+    :return: (rows read, seconds)
+    """
+    n_rows = 0
+    start = time.perf_counter()
+    for raw_transaction in utils.read_rows(filename):
+        n_rows += 1
+        transaction = utils.format_transaction(raw_transaction)
+        utils.validate_transaction(transaction)
+    return n_rows, time.perf_counter() - start
+
+
+def run_stages(utils, stage_fns, filename, batch_size=10000):
+    """
+    Time each stage separately over batches of raw rows.
+    :return: dict of seconds per stage.
+    """
+    parse, date, vendor = stage_fns
+    timings = dict.fromkeys(STAGES, 0.0)
+    rows = utils.read_rows(filename)
+    while True:
+        start = time.perf_counter()
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        parsed = [parse(raw_transaction) for raw_transaction in batch]
+        timings['parse'] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        for raw_transaction in batch:
+            utils.calc_transaction_id(raw_transaction)
+        timings['id'] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        for raw_transaction, p in zip(batch, parsed):
+            date(raw_transaction, p)
+        timings['date'] += time.perf_counter() - start
+
+        vendors = [vendor(raw_transaction, p) for raw_transaction, p in zip(batch, parsed)]
+        start = time.perf_counter()
+        for v in vendors:
+            utils.classifier.categorise_transaction({'vendor': v})
+        timings['categorise'] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        for v in vendors:
+            utils.validate_transaction({'vendor': v})
+        timings['validate'] += time.perf_counter() - start
+    return timings
+
+
+def peak_memory(utils, filename):
+    """
+    :return: peak python memory in MB while running the end-to-end path.
+    """
+    tracemalloc.start()
+    try:
+        run_end_to_end(utils, filename)
+        return tracemalloc.get_traced_memory()[1] / 2 ** 20
+    finally:
+        tracemalloc.stop()
+
+
+def benchmark(files, banks=tuple(BANKS)):
+    results = []
+    for bank in banks:
+        utils_cls, stages = BANKS[bank]
+        n_rows, elapsed = run_end_to_end(utils_cls(categories=files['categories']), files[bank])
+        utils = utils_cls(categories=files['categories'])
+        stage_times = run_stages(utils, stages(utils), files[bank])
+        results.append({'bank': bank,
+                        'rows': n_rows,
+                        'seconds': elapsed,
+                        'rows_per_s': n_rows / elapsed if elapsed else None,
+                        'peak_mb': peak_memory(utils_cls(categories=files['categories']), files[bank]),
+                        'stages': stage_times})
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(row_counts=(10000,), output_dir=None, seed=0):
+    output_dir = output_dir or os.path.join(os.getcwd(), 'benchmark_results')
+    report = {'commit': git_commit(),
+              'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+              'python': platform.python_version(),
+              'machine': platform.machine(),
+              'cpu_count': os.cpu_count(),
+              'runs': []}
+
+    for n_rows in row_counts:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            files = write_dataset(tmp_dir, n_rows, seed=seed)
+            for result in benchmark(files):
+                report['runs'].append(dict(result, generated_rows=n_rows))
+                print('{bank:>7} {rows:>10,} rows {rows_per_s:>10,.0f} rows/s {peak_mb:>8.1f} MB peak  '.format(**result)
+                      + ' '.join('{}={:.2f}s'.format(stage, result['stages'][stage]) for stage in STAGES))
+
+    os.makedirs(output_dir, exist_ok=True)
+    filename = os.path.join(output_dir, '{}_{}.json'.format(datetime.datetime.now().strftime('%Y%m%d_%H%M%S'),
+                                                            report['commit'] or 'nocommit'))
+    with open(filename, 'w') as f:
+        json.dump(report, f, indent=2)
+    print('results written to {}'.format(filename))
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the bank export parsers on synthetic data.')
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000])
+    parser.add_argument('--output-dir')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    main(args.rows, args.output_dir, args.seed)
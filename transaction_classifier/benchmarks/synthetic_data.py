@@ -0,0 +1,213 @@
+"""
+Synthetic ING, NAB and PayPal exports (and a categories.csv) for benchmarking the parsers at scale.
+
+    python -m transaction_classifier.benchmarks.synthetic_data <output dir> --rows 1000000
+
+The files have the same layout as the real downloads: ING with a header and dash-separated descriptions, NAB without a
+header, PayPal with a BOM, quoted fields and a mix of statuses and payment types. Vendors repeat with a long-tailed
+distribution, like a real history does.
+"""
+import argparse
+import csv
+import datetime
+import os
+import random
+import string
+
+VENDOR_NAMES = ['COLES', 'WOOLWORTHS', 'ALDI', 'IGA', '7-ELEVEN', 'BP', 'SHELL', 'CALTEX', 'AMPOL', 'KMART', 'TARGET',
+                'BIG W', 'BUNNINGS', 'OFFICEWORKS', 'JB HI-FI', 'HARVEY NORMAN', 'MYER', 'DAVID JONES', 'UBER',
+                'UBER EATS', 'MENULOG', 'DOMINOS', 'MCDONALDS', 'HUNGRY JACKS', 'KFC', 'SUBWAY', 'GUZMAN Y GOMEZ',
+                'NETFLIX.COM', 'SPOTIFY', 'APPLE.COM/BILL', 'GOOGLE', 'AMAZON AU MARKETP', 'EBAY', 'TELSTRA', 'OPTUS',
+                'ORIGIN ENERGY', 'AGL', 'CHEMIST WAREHOUSE', 'PRICELINE', 'DAN MURPHYS', 'BWS', 'LIQUORLAND',
+                'P-CAFE', 'CAFE', 'BAKERY', 'BUTCHER', 'PHARMACY', 'PARKING', 'MYKI', 'OPAL', 'ANYTIME FITNESS']
+LOCATIONS = ['MELBOURNE', 'SYDNEY', 'GEELONG', 'BRISBANE', 'ADELAIDE', 'PERTH', 'HOBART', 'CANBERRA', 'DARWIN',
+             'SYDNEY SOUTH', 'Los Gatos', 'LUXEMBOURG', 'DUBLIN']
+CATEGORIES = ['GROCERIES', 'FUEL', 'EATING OUT', 'SUBSCRIPTIONS', 'SHOPPING', 'UTILITIES', 'HEALTH', 'ALCOHOL',
+              'TRANSPORT', 'FITNESS', 'HOME']
+
+
+def vendor_pool(n_vendors=500, seed=0):
+    """
+    :return: list of distinct vendor strings, e.g. 'COLES 0810'.
+    """
+    rnd = random.Random(seed)
+    vendors = set()
+    while len(vendors) < n_vendors:
+        vendors.add('{} {:04d}'.format(rnd.choice(VENDOR_NAMES), rnd.randint(0, 9999)))
+    return sorted(vendors)
+
+
+class VendorSampler:
+    """
+    Draws vendors with a Zipf-like distribution so that a few hundred vendors make up most of the rows.
+    """
+
+    def __init__(self, vendors, rnd, batch=10000):
+        self.vendors = vendors
+        self.rnd = rnd
+        self.weights = [1.0 / (rank + 1) for rank in range(len(vendors))]
+        self.batch = batch
+        self._buffer = []
+
+    def __call__(self):
+        if not self._buffer:
+            self._buffer = self.rnd.choices(self.vendors, self.weights, k=self.batch)
+        return self._buffer.pop()
+
+
+def transaction_dates(n_rows, end=datetime.date(2021, 2, 14), max_days=3650):
+    """
+    Yield n_rows dates, newest first, at least 5 a day and spread over at most max_days days.
+    """
+    per_day = max(5, -(-n_rows // max_days))
+    for i in range(n_rows):
+        yield end - datetime.timedelta(days=i // per_day)
+
+
+def ing_description(rnd, vendor, date):
+    kind = rnd.random()
+    receipt = rnd.randint(100000, 999999)
+    card = '462263xxxxxx{:04d}'.format(rnd.randint(0, 9999))
+    if kind < 0.7:
+        return '{} - Visa Purchase - Receipt {}In {} Date {} Card {}'.format(
+            vendor, receipt, rnd.choice(LOCATIONS), date.strftime('%d %b %Y'), card)
+    if kind < 0.85:
+        return '{} - EFTPOS Purchase - Receipt {}Date {} Time {}:{:02d}{} Card {}'.format(
+            vendor, receipt, date.strftime('%d %b %Y'), rnd.randint(1, 12), rnd.randint(0, 59), rnd.choice(['AM', 'PM']),
+            card)
+    if kind < 0.92:
+        return 'Internal Transfer - Receipt {} To {:08d}'.format(receipt, rnd.randint(0, 99999999))
+    if kind < 0.97:
+        return 'Direct Debit - Receipt {} {}'.format(receipt, vendor)
+    return rnd.choice(['Interest Credit', 'ATM Owner Fee Rebate', 'Salary Deposit - Receipt {} From EMPLOYER PTY LTD'
+                       .format(receipt)])
+
+
+def amount(rnd):
+    value = rnd.lognormvariate(3, 1.2)
+    return '{:,.2f}'.format(value) if value >= 1000 else '{:.2f}'.format(value)
+
+
+def write_ing_export(filename, n_rows, vendors, seed=0):
+    rnd = random.Random(seed)
+    sample_vendor = VendorSampler(vendors, rnd)
+    balance = 10000.0
+    with open(filename, 'w', newline='') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(['Date', 'Description', 'Credit', 'Debit', 'Balance'])
+        for date in transaction_dates(n_rows):
+            value = amount(rnd)
+            credit, debit = (value, '') if rnd.random() < 0.1 else ('', '-' + value)
+            balance -= float((credit or debit).replace(',', ''))
+            writer.writerow([date.strftime('%d/%m/%Y'), ing_description(rnd, sample_vendor(), date), credit, debit,
+                             '{:.2f}'.format(balance)])
+
+
+def write_nab_export(filename, n_rows, vendors, seed=0):
+    """
+    NAB exports have no header row.
+    """
+    rnd = random.Random(seed)
+    sample_vendor = VendorSampler(vendors, rnd)
+    with open(filename, 'w', newline='') as csv_file:
+        writer = csv.writer(csv_file)
+        for date in transaction_dates(n_rows):
+            date_format = '%d-%b-%y' if rnd.random() < 0.9 else '%d %b %y'
+            vendor = 'CASH/TRANSFER PAYMENT - THANK YOU' if rnd.random() < 0.02 else sample_vendor()
+            writer.writerow([date.strftime(date_format), '-' + amount(rnd), '', '', rnd.choice(['EFTPOS', 'VISA', '']),
+                             vendor, '{:.2f}'.format(rnd.uniform(-5000, 0))])
+
+
+def write_paypal_export(filename, n_rows, vendors, seed=0):
+    rnd = random.Random(seed)
+    sample_vendor = VendorSampler(vendors, rnd)
+    types = ['Express Checkout Payment', 'eBay Auction Payment', 'General Card Deposit', 'General Currency Conversion']
+    with open(filename, 'w', newline='', encoding='utf-8-sig') as csv_file:
+        writer = csv.writer(csv_file, quoting=csv.QUOTE_ALL)
+        writer.writerow(['Date', 'Time', 'Time zone', 'Name', 'Type', 'Status', 'Currency', 'Amount', 'Receipt ID',
+                         'Balance'])
+        for date in transaction_dates(n_rows):
+            writer.writerow([date.strftime('%d/%m/%Y'), '{:02d}:{:02d}:{:02d}'.format(rnd.randint(0, 23),
+                                                                                    rnd.randint(0, 59),
+                                                                                    rnd.randint(0, 59)),
+                             'Australia/Sydney', sample_vendor(), rnd.choices(types, [6, 3, 1, 1])[0],
+                             rnd.choices(['Completed', 'Pending', 'Reversed'], [8, 1, 1])[0], 'AUD',
+                             '-' + amount(rnd), '', '0.00'])
+
+
+def write_categories(filename, n_categories=100, words_per_category=10, seed=0):
+    """
+    Write a categories.csv (Category, SeedWords) whose seed words match some of the synthetic vendors, padded out with
+    random words up to n_categories * words_per_category seed phrases.
+    """
+    rnd = random.Random(seed)
+    names = list(VENDOR_NAMES)
+    rnd.shuffle(names)
+    with open(filename, 'w', newline='', encoding='UTF-8') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(['Category', 'SeedWords'])
+        for i in range(n_categories):
+            words = [names.pop()] if names else []
+            while len(words) < words_per_category:
+                words.append(''.join(rnd.choice(string.ascii_uppercase) for _ in range(rnd.randint(4, 10))))
+            category = CATEGORIES[i] if i < len(CATEGORIES) else 'CATEGORY_{}'.format(i)
+            writer.writerow([category, ', '.join(words)])
+
+
+def transactions_frame(n_rows, n_vendors=500, labelled=0.8, noise=0.05, seed=0):
+    """
+    A transactions table as the classifier reads it, for benchmarking expense_categoriser_ml. Each vendor name has a
+    category, a fraction noise of the labels are random and the rest of the rows (1 - labelled) are uncategorised.
+    """
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    vendors = np.array(vendor_pool(n_vendors, seed))
+    weights = 1.0 / np.arange(1, n_vendors + 1)
+    vendor_idx = rng.choice(n_vendors, size=n_rows, p=weights / weights.sum())
+    name_category = {name: CATEGORIES[i % len(CATEGORIES)] for i, name in enumerate(VENDOR_NAMES)}
+    vendor_category = np.array([name_category[vendor.rsplit(' ', 1)[0]] for vendor in vendors])
+    category = vendor_category[vendor_idx].astype(object)
+    noisy = rng.random(n_rows) < noise
+    category[noisy] = rng.choice(CATEGORIES, size=int(noisy.sum()))
+    category[rng.random(n_rows) >= labelled] = None
+    dates = pd.Timestamp(2021, 2, 14) - pd.to_timedelta(np.sort(rng.integers(0, 3650, size=n_rows)), unit='D')
+    return pd.DataFrame({'id': ['{:032x}'.format(i) for i in range(n_rows)],
+                         'date': dates,
+                         'trans_date': dates,
+                         'vendor': vendors[vendor_idx],
+                         'location': np.where(rng.random(n_rows) < 0.5, rng.choice(LOCATIONS, size=n_rows), None),
+                         'amount': -np.round(rng.lognormal(3, 1.2, size=n_rows), 2),
+                         'account': rng.choice(['ing', 'nab_paul', 'nab_ettie', 'paypal'], size=n_rows),
+                         'category': category,
+                         'ml': 0})
+
+
+def write_dataset(output_dir, n_rows, n_vendors=500, n_categories=100, seed=0):
+    """
+    Write Transactions.csv (ING), TransactionHistory.csv (NAB), Download.CSV (PayPal) and categories.csv.
+    :return: dict of file paths keyed by 'ing', 'nab', 'paypal' and 'categories'.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    vendors = vendor_pool(n_vendors, seed)
+    files = {'ing': os.path.join(output_dir, 'Transactions.csv'),
+             'nab': os.path.join(output_dir, 'TransactionHistory.csv'),
+             'paypal': os.path.join(output_dir, 'Download.CSV'),
+             'categories': os.path.join(output_dir, 'categories.csv')}
+    write_ing_export(files['ing'], n_rows, vendors, seed)
+    write_nab_export(files['nab'], n_rows, vendors, seed)
+    write_paypal_export(files['paypal'], n_rows, vendors, seed)
+    write_categories(files['categories'], n_categories, seed=seed)
+    return files
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Write synthetic bank exports for benchmarking.')
+    parser.add_argument('output_dir')
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--vendors', type=int, default=500)
+    parser.add_argument('--categories', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    print(write_dataset(args.output_dir, args.rows, args.vendors, args.categories, args.seed))
@@ -0,0 +1,151 @@
+"""
+Database settings and the pooled connection provider shared by the luigi tasks, the ML job and the dashboard.
+
+Every connection comes from one SQLAlchemy engine per process. luigi tasks get raw DBAPI (mysql.connector)
+connections from it through PooledMySqlTarget, pandas gets the engine itself, and close() hands the connection back
+to the pool instead of disconnecting.
+"""
+import logging
+import os
+
+import luigi
+import mysql.connector
+from luigi.contrib.mysqldb import MySqlTarget
+from sqlalchemy import create_engine, event
+
+logger = logging.getLogger(__name__)
+
+
+class banking_db(luigi.Config):
+    """
+    [banking_db] section of luigi.cfg.
+    """
+    host = luigi.Parameter(default='localhost')
+    port = luigi.IntParameter(default=3306)
+    database = luigi.Parameter(default='banking_db')
+    user = luigi.Parameter(default='root')
+    password = luigi.Parameter(default='')
+    # connections kept open in the pool, and how many more may be opened at peak before callers wait:
+    pool_size = luigi.IntParameter(default=5)
+    max_overflow = luigi.IntParameter(default=5)
+    pool_timeout = luigi.IntParameter(default=30)
+    pool_recycle = luigi.IntParameter(default=3600)
+    # for the pooled connections; the load_data strategy opens its own connection with it on, see
+    # get_local_infile_connection:
+    allow_local_infile = luigi.BoolParameter(default=False)
+
+
+class PoolMetrics:
+    """
+    Counts connections opened by the pool and checkouts served from it.
+    """
+
+    def __init__(self):
+        self.created = 0
+        self.checkouts = 0
+        self.in_use = 0
+        self.peak_in_use = 0
+
+    def on_connect(self, dbapi_connection, connection_record):
+        self.created += 1
+
+    def on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        self.checkouts += 1
+        self.in_use += 1
+        self.peak_in_use = max(self.peak_in_use, self.in_use)
+
+    def on_checkin(self, dbapi_connection, connection_record):
+        self.in_use -= 1
+
+    def stats(self):
+        return {'created': self.created,
+                'checkouts': self.checkouts,
+                'reused': self.checkouts - self.created,
+                'in_use': self.in_use,
+                'peak_in_use': self.peak_in_use}
+
+
+_engine = None
+pool_metrics = PoolMetrics()
+
+
+def _reset_after_fork():
+    # luigi runs tasks in forked worker processes; pooled sockets must not be shared with the parent.
+    global _engine, pool_metrics
+    if _engine is not None:
+        _engine.dispose(close=False)
+    _engine = None
+    pool_metrics = PoolMetrics()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_engine():
+    """
+    Return the process-wide engine, creating it from the banking_db settings on first use.
+    """
+    global _engine
+    if _engine is None:
+        settings = banking_db()
+
+        def connect():
+            return mysql.connector.connect(host=settings.host, port=settings.port, database=settings.database,
+                                           user=settings.user, password=settings.password,
+                                           allow_local_infile=settings.allow_local_infile)
+
+        _engine = create_engine('mysql+mysqlconnector://', creator=connect, pool_size=settings.pool_size,
+                                max_overflow=settings.max_overflow, pool_timeout=settings.pool_timeout,
+                                pool_recycle=settings.pool_recycle, pool_pre_ping=True)
+        event.listen(_engine, 'connect', pool_metrics.on_connect)
+        event.listen(_engine, 'checkout', pool_metrics.on_checkout)
+        event.listen(_engine, 'checkin', pool_metrics.on_checkin)
+    return _engine
+
+
+def get_connection(autocommit=False):
+    """
+    :return: pooled mysql.connector connection; close() returns it to the pool.
+    """
+    connection = get_engine().raw_connection()
+    connection.dbapi_connection.autocommit = autocommit
+    return connection
+
+
+def get_local_infile_connection():
+    """
+    :return: unpooled mysql.connector connection allowed to LOAD DATA LOCAL INFILE, for the load_data strategy
+        only so the pooled connections can keep it off; close() disconnects it.
+    """
+    settings = banking_db()
+    return mysql.connector.connect(host=settings.host, port=settings.port, database=settings.database,
+                                   user=settings.user, password=settings.password, allow_local_infile=True)
+
+
+def log_pool_metrics():
+    logger.info('Connection pool: {created} opened, {checkouts} checkouts, {reused} reused, peak {peak_in_use} in use'
+                .format(**pool_metrics.stats()))
+
+
+class PooledMySqlTarget(MySqlTarget):
+    """
+    MySqlTarget whose connections come from the shared pool instead of a new mysql.connector.connect each time.
+    """
+
+    def __init__(self, table, update_id):
+        settings = banking_db()
+        super().__init__(host='{}:{}'.format(settings.host, settings.port), database=settings.database,
+                         user=settings.user, password=settings.password, table=table, update_id=update_id)
+
+    def connect(self, autocommit=False):
+        return get_connection(autocommit)
+
+    def exists(self, connection=None):
+        if connection is not None:
+            return super().exists(connection)
+        connection = self.connect(autocommit=True)
+        try:
+            return super().exists(connection)
+        finally:
+            connection.close()
@@ -0,0 +1,168 @@
+import hashlib
+import logging
+import math
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def _id_digest(i):
+    if len(i) == 32:
+        try:
+            return bytes.fromhex(i)
+        except ValueError:
+            pass
+    return hashlib.md5(i.encode('utf-8')).digest()
+
+
+def _id_digests(ids):
+    """
+    :return: (n, 2) uint64 array with 128 bits per id. md5/blake2b hex ids are used as they are, anything else is
+    hashed with md5 first.
+    """
+    try:
+        if all(len(i) == 32 for i in ids):
+            return np.frombuffer(bytes.fromhex(''.join(ids)), dtype='<u8').reshape(-1, 2)
+    except ValueError:
+        pass
+    return np.frombuffer(b''.join([_id_digest(i) for i in ids]), dtype='<u8').reshape(-1, 2)
+
+
+class BloomFilter:
+    """
+    Bloom filter over transaction ids, sized for capacity ids at the given false positive rate (about 1.2 MB per
+    million ids at 1%). Adds and lookups work on whole batches of ids with numpy.
+    """
+
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(int(capacity), 1)
+        self.n_bits = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 64)
+        self.n_hashes = max(int(round(self.n_bits / capacity * math.log(2))), 1)
+        self.bits = np.zeros((self.n_bits + 7) // 8, dtype=np.uint8)
+        self.count = 0
+
+    def _positions(self, ids):
+        digests = _id_digests(ids)
+        h1 = digests[:, 0]
+        h2 = digests[:, 1] | np.uint64(1)
+        rounds = np.arange(self.n_hashes, dtype=np.uint64)
+        # double hashing, h1 + i * h2 (mod 2**64) for each of the n_hashes rounds.
+        return (h1[:, None] + rounds[None, :] * h2[:, None]) % np.uint64(self.n_bits)
+
+    def add(self, ids):
+        if not ids:
+            return
+        positions = self._positions(ids).ravel()
+        np.bitwise_or.at(self.bits, positions >> np.uint64(3),
+                         np.left_shift(np.uint8(1), (positions & np.uint64(7)).astype(np.uint8)))
+        self.count += len(ids)
+
+    def contains(self, ids):
+        """
+        :return: boolean array, False where an id is certainly not in the filter.
+        """
+        if not ids:
+            return np.zeros(0, dtype=bool)
+        positions = self._positions(ids)
+        bits = self.bits[positions >> np.uint64(3)] >> (positions & np.uint64(7)).astype(np.uint8)
+        return (bits & 1).all(axis=1)
+
+    @property
+    def nbytes(self):
+        return self.bits.nbytes
+
+
+class KnownIds:
+    """
+    Exact set of the ids already in the transactions table.
+    """
+
+    def __init__(self, ids=()):
+        self._ids = set(ids)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def known(self, ids):
+        """
+        :return: list of booleans, True for the ids that are already loaded.
+        """
+        return [i in self._ids for i in ids]
+
+
+class BloomKnownIds:
+    """
+    Bloom filter of the ids already loaded, with every positive confirmed exactly by confirm so that a false
+    positive never drops a new transaction.
+
+    :param confirm: callable taking a list of ids and returning the set of those that really exist.
+    """
+
+    def __init__(self, bloom, confirm):
+        self.bloom = bloom
+        self.confirm = confirm
+        self.false_positives = 0
+
+    def __len__(self):
+        return self.bloom.count
+
+    def known(self, ids):
+        maybe = self.bloom.contains(ids)
+        candidates = [i for i, m in zip(ids, maybe) if m]
+        confirmed = self.confirm(candidates) if candidates else set()
+        self.false_positives += len(candidates) - len(confirmed)
+        return [i in confirmed for i in ids]
+
+
+def _select_ids(connection, table, batch_size):
+    cursor = connection.cursor()
+    cursor.execute('SELECT id FROM {};'.format(table))
+    while True:
+        batch = cursor.fetchmany(batch_size)
+        if not batch:
+            break
+        yield [row[0] for row in batch]
+
+
+def confirm_ids(connection, table='transactions', placeholder='%s', chunk_size=1000):
+    """
+    :return: confirm callable for BloomKnownIds that looks the candidates up through the index on table.id.
+    """
+    def confirm(ids):
+        found = set()
+        cursor = connection.cursor()
+        for start in range(0, len(ids), chunk_size):
+            chunk = ids[start:start + chunk_size]
+            cursor.execute('SELECT id FROM {} WHERE id IN ({});'.format(table, ','.join([placeholder] * len(chunk))),
+                           chunk)
+            found.update(row[0] for row in cursor.fetchall())
+        return found
+    return confirm
+
+
+def load_known_ids(connection, mode='exact', table='transactions', placeholder='%s', error_rate=0.01,
+                   batch_size=100000):
+    """
+    Read the ids already in table once.
+
+    :param mode: 'exact' keeps every id in a set, 'bloom' keeps a BloomFilter whose size only depends on the row
+        count and confirms its hits against the table.
+    :return: KnownIds or BloomKnownIds.
+    """
+    if mode == 'exact':
+        known_ids = KnownIds()
+        for ids in _select_ids(connection, table, batch_size):
+            known_ids._ids.update(ids)
+        logger.info('Loaded {} known transaction ids'.format(len(known_ids)))
+        return known_ids
+
+    cursor = connection.cursor()
+    cursor.execute('SELECT COUNT(*) FROM {};'.format(table))
+    n_rows = cursor.fetchone()[0]
+    bloom = BloomFilter(n_rows * 1.1 + 1000, error_rate)
+    for ids in _select_ids(connection, table, batch_size):
+        bloom.add(ids)
+    logger.info('Loaded {} known transaction ids into a {:.1f} MB bloom filter'.format(bloom.count,
+                                                                                     bloom.nbytes / 2 ** 20))
+    return BloomKnownIds(bloom, confirm_ids(connection, table, placeholder))
@@ -0,0 +1,133 @@
+import datetime
+import math
+import os
+import tempfile
+
+# NULL as LOAD DATA INFILE reads it with the default FIELDS ESCAPED BY '\\'.
+TSV_NULL = '\\N'
+
+TSV_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r', '\0': '\\0'})
+TSV_UNESCAPES = {'\\': '\\', 't': '\t', 'n': '\n', 'r': '\r', '0': '\0'}
+
+
+def tsv_field(value):
+    """
+    Encode one value the way MySQL's LOAD DATA reads it with the default FIELDS/LINES options.
+    """
+    if isinstance(value, str):
+        return value.translate(TSV_ESCAPES)
+    if value is None:
+        return TSV_NULL
+    if isinstance(value, float):
+        return TSV_NULL if math.isnan(value) else repr(value)
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, datetime.datetime):
+        return value.isoformat(' ', 'seconds')
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        value = value.decode('utf-8')
+    return str(value).translate(TSV_ESCAPES)
+
+
+def read_tsv_field(field):
+    if field == TSV_NULL:
+        return None
+    if '\\' not in field:
+        return field
+    chars = []
+    escaped = False
+    for c in field:
+        if escaped:
+            chars.append(TSV_UNESCAPES.get(c, c))
+            escaped = False
+        elif c == '\\':
+            escaped = True
+        else:
+            chars.append(c)
+    return ''.join(chars)
+
+
+def write_tsv(rows, tsv_file):
+    """
+    :param tsv_file: text file opened with newline='\\n' and encoding='utf-8'.
+    :return: number of rows written.
+    """
+    n_rows = 0
+    for row in rows:
+        tsv_file.write('\t'.join([tsv_field(value) for value in row]))
+        tsv_file.write('\n')
+        n_rows += 1
+    return n_rows
+
+
+def read_tsv(tsv_file):
+    for line in tsv_file:
+        yield tuple(read_tsv_field(field) for field in line.rstrip('\n').split('\t'))
+
+
+def _staged_tsv(rows, tmp_dir=None):
+    """
+    Stream rows into a temporary TSV file.
+    :return: (path, number of rows). The caller removes the file.
+    """
+    fd, path = tempfile.mkstemp(suffix='.tsv', dir=tmp_dir)
+    with os.fdopen(fd, 'w', encoding='utf-8', newline='\n') as tsv_file:
+        n_rows = write_tsv(rows, tsv_file)
+    return path, n_rows
+
+
+def executemany_load(connection, table, columns, rows, bulk_size=10000, placeholder='%s'):
+    """
+    Insert rows with cursor.executemany in batches of bulk_size.
+    :return: number of rows inserted.
+    """
+    values = '({})'.format(','.join([placeholder for i in range(len(columns))]))
+    query = 'INSERT INTO {} ({}) VALUES {}'.format(table, ','.join(columns), values)
+    batch = []
+    n_rows = 0
+
+    for idx, row in enumerate(rows):
+        batch.append(row)
+        n_rows += 1
+
+        if (idx + 1) % bulk_size == 0:
+            connection.cursor().executemany(query, batch)
+            batch = []
+
+    if batch:
+        connection.cursor().executemany(query, batch)
+    return n_rows
+
+
+def mysql_load_data(connection, table, columns, rows, tmp_dir=None):
+    """
+    Stream rows into a temporary TSV and load it with a single LOAD DATA LOCAL INFILE. The connection must have
+    been opened with allow_local_infile=True, see db.get_local_infile_connection.
+    :return: number of rows loaded.
+    """
+    path, n_rows = _staged_tsv(rows, tmp_dir)
+    try:
+        query = "LOAD DATA LOCAL INFILE %s INTO TABLE {} CHARACTER SET utf8mb4 " \
+                "FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' ({})".format(table, ','.join(columns))
+        connection.cursor().execute(query, (path.replace('\\', '/'),))
+    finally:
+        os.remove(path)
+    return n_rows
+
+
+def sqlite_load_file(connection, table, columns, rows, tmp_dir=None):
+    """
+    SQLite counterpart of mysql_load_data: the rows go through the same staged TSV file and are read back into a
+    single INSERT transaction, so the file path can be exercised without a MySQL server.
+    :return: number of rows loaded.
+    """
+    path, n_rows = _staged_tsv(rows, tmp_dir)
+    try:
+        query = 'INSERT INTO {} ({}) VALUES ({})'.format(table, ','.join(columns), ','.join('?' * len(columns)))
+        with open(path, 'r', encoding='utf-8', newline='\n') as tsv_file:
+            connection.executemany(query, read_tsv(tsv_file))
+    finally:
+        os.remove(path)
+    return n_rows
@@ -0,0 +1,134 @@
+"""
+Versioned store of trained expense classifiers, so ClassifyUnknownTransactions only retrains when the labelled
+transactions change.
+
+    models/3f2a9c1e0b7d4a56/model.joblib
+    models/3f2a9c1e0b7d4a56/metadata.json
+    models/online/online-2-1024/model.joblib
+
+Each version is named after a fingerprint of the labelled training set and the training settings. model.joblib holds
+the fitted classifier, vectorisers and category list, dumped uncompressed so that its arrays can be memory-mapped on
+load. Enable it in luigi.cfg:
+
+    [model_store]
+    enabled=true
+    path=transactions/models
+"""
+import datetime
+import hashlib
+import json
+import logging
+import os
+import shutil
+
+import joblib
+import luigi
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# bump when the artifact layout changes, so that older artifacts are not loaded by newer code.
+ARTIFACT_FORMAT = 2
+FINGERPRINT_COLUMNS = ['id', 'trans_date', 'vendor', 'location', 'amount', 'account', 'category']
+
+
+class model_store(luigi.Config):
+    """
+    [model_store] section of luigi.cfg.
+    """
+    enabled = luigi.BoolParameter(default=False)
+    path = luigi.Parameter(default='models')
+    # number of versions kept on disk, newest first:
+    keep_versions = luigi.IntParameter(default=5)
+
+
+def fingerprint(labelled_df, **settings):
+    """
+    :param labelled_df: the transactions the model is trained on.
+    :param settings: training settings that change the model, e.g. the featuriser.
+    :return: 16 hex digit key that changes whenever the training rows (in any order) or the settings change.
+    """
+    columns = [column for column in FINGERPRINT_COLUMNS if column in labelled_df]
+    frame = labelled_df[columns].sort_values('id')
+    digest = hashlib.sha256(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+    digest.update(json.dumps(dict(settings, format=ARTIFACT_FORMAT), sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+class ModelStore:
+    """
+    Directory of model versions keyed by fingerprint.
+    """
+
+    def __init__(self, path, keep_versions=5):
+        self.path = path
+        self.keep_versions = keep_versions
+
+    def _version_path(self, key):
+        return os.path.join(self.path, key)
+
+    def exists(self, key):
+        return os.path.exists(os.path.join(self._version_path(key), 'model.joblib'))
+
+    def save(self, key, artifact, metadata=None):
+        """
+        Write artifact and its metadata as version key, replacing any earlier version with the same key.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        # build the version in a hidden directory and move it into place, so a reader never sees half an artifact.
+        tmp_path = os.path.join(self.path, '.{}.tmp'.format(key))
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        joblib.dump(artifact, os.path.join(tmp_path, 'model.joblib'))
+        metadata = dict(metadata or {}, key=key, format=ARTIFACT_FORMAT,
+                        created=datetime.datetime.now().isoformat(' ', 'seconds'))
+        with open(os.path.join(tmp_path, 'metadata.json'), 'w') as metadata_file:
+            json.dump(metadata, metadata_file, indent=2, default=str)
+        shutil.rmtree(self._version_path(key), ignore_errors=True)
+        os.replace(tmp_path, self._version_path(key))
+        logger.info('Saved model {}'.format(key))
+        self.prune()
+
+    def load(self, key, mmap_mode='r'):
+        """
+        :return: the artifact saved as version key, with its arrays memory-mapped when mmap_mode is set.
+        """
+        return joblib.load(os.path.join(self._version_path(key), 'model.joblib'), mmap_mode=mmap_mode)
+
+    def metadata(self, key):
+        with open(os.path.join(self._version_path(key), 'metadata.json')) as metadata_file:
+            return json.load(metadata_file)
+
+    def versions(self):
+        """
+        :return: keys of the stored versions, newest first.
+        """
+        if not os.path.isdir(self.path):
+            return []
+        keys = [key for key in os.listdir(self.path) if not key.startswith('.') and self.exists(key)]
+        return sorted(keys, key=lambda key: os.path.getmtime(self._version_path(key)), reverse=True)
+
+    def namespace(self, name):
+        """
+        :return: ModelStore in the subdirectory name, whose versions are listed and pruned apart from these, e.g. the
+            online model, which is updated in place and must not be pruned by new forest versions.
+        """
+        return ModelStore(os.path.join(self.path, name), self.keep_versions)
+
+    def latest(self):
+        versions = self.versions()
+        return versions[0] if versions else None
+
+    def prune(self):
+        for key in self.versions()[self.keep_versions:]:
+            shutil.rmtree(self._version_path(key), ignore_errors=True)
+
+
+def get_model_store():
+    """
+    :return: ModelStore at the configured path, or None when the store is disabled.
+    """
+    settings = model_store()
+    if not settings.enabled:
+        return None
+    return ModelStore(settings.path, settings.keep_versions)
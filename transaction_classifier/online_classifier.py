@@ -0,0 +1,63 @@
+"""
+Incrementally trained expense classifier, the 'online' learner of expense_categoriser_ml.
+
+Instead of refitting on the whole history every run, the model is updated with only the transactions labelled since
+the previous run. It works on hashed features (see expense_categoriser_ml.hashing_vectorisers), so the feature space
+is the same from one run to the next, and keeps one binary SGD classifier per category, so a category that appears for
+the first time just adds a classifier.
+"""
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import SGDClassifier
+
+
+class OnlineClassifier:
+    """
+    One-vs-rest logistic regression trained with partial_fit.
+
+    Expects the featurise layout: column 0 is the amount and column 1 the day of the week, the rest are token counts.
+    predict returns indices into categories.
+    """
+
+    def __init__(self, alpha=1e-5, random_state=0):
+        self.alpha = alpha
+        self.random_state = random_state
+        self.categories = []
+        self.classifiers = []
+        self.n_updates = 0
+
+    def _scale(self, vector):
+        # amounts span several orders of magnitude, which a linear model cannot use as they are.
+        vector = vector.tocsr(copy=True)
+        amount = vector.indices == 0
+        vector.data[amount] = np.sign(vector.data[amount]) * np.log1p(np.abs(vector.data[amount]))
+        vector.data[vector.indices == 1] /= 6
+        return vector
+
+    def partial_fit(self, vector, labels, epochs=1):
+        """
+        Update the model with the labelled rows of vector, adding a classifier for each new category.
+        :param labels: category name of each row.
+        :param epochs: passes over the rows, in a new random order each time.
+        """
+        vector = self._scale(vector)
+        labels = np.asarray(labels, dtype=object)
+        for category in pd.unique(labels):
+            if category not in self.categories:
+                self.categories.append(category)
+                self.classifiers.append(SGDClassifier(loss='log_loss', alpha=self.alpha,
+                                                      random_state=self.random_state))
+
+        rng = np.random.default_rng([self.random_state, self.n_updates])
+        for _ in range(epochs):
+            order = rng.permutation(vector.shape[0])
+            vector_epoch, labels_epoch = vector[order], labels[order]
+            for category, classifier in zip(self.categories, self.classifiers):
+                classifier.partial_fit(vector_epoch, labels_epoch == category, classes=[False, True])
+        self.n_updates += 1
+        return self
+
+    def predict(self, vector):
+        vector = self._scale(vector)
+        scores = np.column_stack([classifier.decision_function(vector) for classifier in self.classifiers])
+        return scores.argmax(axis=1)
@@ -0,0 +1,77 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+
+# Utils instance of the current worker process, built once by _init_worker.
+_worker_utils = None
+
+
+def chunk_boundaries(filename, data_start, n_chunks):
+    """
+    Split the transactions of an export into byte ranges that start and end on line boundaries.
+
+    :param data_start: byte offset of the first transaction (i.e. just after any header).
+    :return: list of (start, end) byte offsets covering the file from data_start to the end.
+    """
+    size = os.path.getsize(filename)
+    step = max((size - data_start) // max(n_chunks, 1), 1)
+    bounds = [data_start]
+    with open(filename, 'rb') as csv_file:
+        for i in range(1, n_chunks):
+            pos = data_start + i * step
+            if pos <= bounds[-1]:
+                continue
+            # finish the line containing byte pos - 1, so the chunk starts on the next line.
+            csv_file.seek(pos - 1)
+            csv_file.readline()
+            pos = csv_file.tell()
+            if pos >= size:
+                break
+            if pos > bounds[-1]:
+                bounds.append(pos)
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+
+def _init_worker(utils_cls, utils_kwargs):
+    global _worker_utils
+    _worker_utils = utils_cls(**utils_kwargs)
+
+
+def _format_chunk(filename, layout, start, end):
+    utils = _worker_utils
+    rows = []
+    for raw_transaction in layout.rows(filename, start, end):
+        transaction = utils.format_transaction(raw_transaction)
+        if utils.validate_transaction(transaction):
+            rows.append(tuple([v for k, v in transaction.items()]))
+    cache = utils.classifier.cache
+    return rows, cache.take_new() if cache is not None else []
+
+
+def parallel_rows(utils_cls, utils_kwargs, filename, workers=None, chunks_per_worker=4, cache=None):
+    """
+    Format, validate and categorise an export in a process pool.
+
+    The file is split into byte-range chunks on line boundaries and each worker formats whole chunks with its own
+    utils_cls(**utils_kwargs). Batches come back in file order, so the rows are yielded in the same order as the
+    single process rows().
+
+    :param utils_cls: IngUtils, NabUtils or PaypalUtils.
+    :param workers: number of processes (default: one per core).
+    :param cache: optional CategoryCache of the calling process, given the vendors the workers categorised so that
+        saving it keeps them.
+    """
+    workers = workers or os.cpu_count()
+    layout = utils_cls.csv_layout(filename)
+    chunks = chunk_boundaries(filename, layout.data_start, workers * chunks_per_worker)
+    if not chunks:
+        return
+
+    starts, ends = zip(*chunks)
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(utils_cls, utils_kwargs)) as pool:
+        for rows, new_entries in pool.map(_format_chunk, repeat(filename), repeat(layout), starts, ends):
+            if cache is not None:
+                cache.merge(new_entries)
+            yield from rows
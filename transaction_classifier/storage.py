@@ -0,0 +1,324 @@
+"""
+Storage backends for the transactions database.
+
+The pipeline, the ML job and the dashboard only talk to the database through a backend object, chosen by the
+[storage] section of luigi.cfg:
+
+    [storage]
+    backend=sqlite
+    sqlite_path=transactions/banking_db.sqlite
+
+'mysql' is the MySQL server configured in [banking_db]; 'sqlite' is an embedded single-file database with the same
+tables, so a full load, dedup and category update can run without a server.
+"""
+import datetime
+import logging
+import re
+import sqlite3
+
+import luigi
+import pandas as pd
+from sqlalchemy import create_engine, text
+
+from transaction_classifier.db import (banking_db, get_connection, get_engine, get_local_infile_connection,
+                                       PooledMySqlTarget)
+from transaction_classifier.loaders import executemany_load, mysql_load_data, sqlite_load_file
+
+logger = logging.getLogger(__name__)
+
+# store datetimes the way MySQL prints them rather than relying on sqlite3's deprecated default adapter.
+sqlite3.register_adapter(datetime.datetime, lambda value: value.isoformat(' '))
+sqlite3.register_adapter(datetime.date, lambda value: value.isoformat())
+
+
+class storage(luigi.Config):
+    """
+    [storage] section of luigi.cfg.
+    """
+    backend = luigi.ChoiceParameter(choices=['mysql', 'sqlite'], default='mysql')
+    sqlite_path = luigi.Parameter(default='banking_db.sqlite')
+
+
+def staging_table(*parts):
+    """
+    :return: name of the staging table for one task, e.g. staging_table('ing', run_id) ->
+        'new_transactions_ing_run_20210214_160109'.
+    """
+    name = '_'.join(['new_transactions'] + [str(part) for part in parts])
+    # MySQL identifiers are at most 64 characters.
+    return re.sub(r'\W', '_', name).lower()[:64]
+
+
+class MySqlStorage:
+    """
+    The MySQL server in [banking_db], through the shared connection pool.
+    """
+    name = 'mysql'
+    placeholder = '%s'
+    unique_index = 'ux_transactions_id'
+
+    def connect(self):
+        return get_connection()
+
+    def engine(self):
+        return get_engine()
+
+    def target(self, table, update_id):
+        return PooledMySqlTarget(table=table, update_id=update_id)
+
+    def read_transactions(self, qry='SELECT * FROM transactions;'):
+        return pd.read_sql(qry, self.engine(), parse_dates=True)
+
+    def read_staged(self, staging_table):
+        """
+        :return: the rows of transactions whose id is in staging_table, as stored after promote/update.
+        """
+        return self.read_transactions('SELECT * FROM transactions WHERE id IN (SELECT id FROM {});'
+                                      .format(staging_table))
+
+    def execute(self, qry):
+        with self.engine().begin() as connection:
+            return connection.execute(text(qry)).rowcount
+
+    def truncate(self, connection, table):
+        connection.cursor().execute('TRUNCATE {};'.format(table))
+        connection.commit()
+
+    def create_staging(self, connection, table):
+        """
+        (Re)create table as an empty copy of new_transactions, dropping whatever a failed earlier attempt left in it.
+        """
+        cursor = connection.cursor()
+        cursor.execute('DROP TABLE IF EXISTS {};'.format(table))
+        cursor.execute('CREATE TABLE {} LIKE new_transactions;'.format(table))
+        connection.commit()
+
+    def drop_staging(self, connection, table):
+        connection.cursor().execute('DROP TABLE IF EXISTS {};'.format(table))
+        connection.commit()
+
+    def stage(self, connection, table, columns, rows, strategy='executemany', bulk_size=10000):
+        """
+        :return: number of rows written to the staging table.
+        """
+        if strategy == 'load_data':
+            # the staging table is a regular table, so the rows loaded and committed on this connection are
+            # visible to connection.
+            infile_connection = get_local_infile_connection()
+            try:
+                n_rows = mysql_load_data(infile_connection, table, columns, rows)
+                infile_connection.commit()
+            finally:
+                infile_connection.close()
+            return n_rows
+        return executemany_load(connection, table, columns, rows, bulk_size)
+
+    def ensure_unique_id(self, connection):
+        """
+        Make sure transactions.id is covered by a primary or unique key on id alone, adding unique_index if not.
+        """
+        cursor = connection.cursor()
+        cursor.execute("SELECT INDEX_NAME FROM information_schema.STATISTICS "
+                       "WHERE TABLE_SCHEMA = %s AND TABLE_NAME = 'transactions' AND NON_UNIQUE = 0 "
+                       "GROUP BY INDEX_NAME HAVING COUNT(*) = 1 AND MAX(COLUMN_NAME) = 'id';",
+                       (banking_db().database,))
+        if cursor.fetchall():
+            return
+        logger.info('Adding unique index {} on transactions.id'.format(self.unique_index))
+        cursor.execute('ALTER TABLE transactions ADD UNIQUE INDEX {} (id);'.format(self.unique_index))
+        connection.commit()
+
+    def promote(self, connection, staging_table, mode='anti_join'):
+        """
+        Copy the staged rows that are not in transactions yet.
+        :param mode: 'insert_ignore' relies on the unique index on transactions.id, 'anti_join' does not.
+        :return: number of rows inserted.
+        """
+        cursor = connection.cursor()
+        if mode == 'insert_ignore':
+            self.ensure_unique_id(connection)
+            qry = "INSERT IGNORE INTO transactions SELECT * FROM {};".format(staging_table)
+        else:
+            qry = "INSERT INTO transactions " \
+                  "(SELECT B.* FROM transactions A RIGHT JOIN {} B on A.id = B.id WHERE A.id is NULL);" \
+                  .format(staging_table)
+        cursor.execute(qry)
+        connection.commit()
+        return cursor.rowcount
+
+    def update_categories(self, staging_table):
+        """
+        Copy the categories in staging_table onto the matching transactions.
+        :return: number of rows updated.
+        """
+        return self.execute("UPDATE transactions a INNER JOIN {} b ON a.id = b.id SET a.category = b.category;"
+                            .format(staging_table))
+
+
+class SqliteTarget(luigi.Target):
+    """
+    SQLite counterpart of MySqlTarget, recording completed updates in the same table_updates marker table.
+    """
+    marker_table = 'table_updates'
+
+    def __init__(self, backend, table, update_id):
+        self.backend = backend
+        self.table = table
+        self.update_id = update_id
+
+    def __str__(self):
+        return self.table
+
+    def connect(self, autocommit=False):
+        return self.backend.connect()
+
+    def touch(self, connection=None):
+        if connection is None:
+            connection = self.connect()
+        connection.execute('INSERT OR REPLACE INTO {} (update_id, target_table) VALUES (?, ?);'
+                           .format(self.marker_table), (self.update_id, self.table))
+        connection.commit()
+
+    def exists(self, connection=None):
+        close = connection is None
+        connection = connection or self.connect()
+        try:
+            row = connection.execute('SELECT 1 FROM {} WHERE update_id = ? LIMIT 1;'.format(self.marker_table),
+                                     (self.update_id,)).fetchone()
+        finally:
+            if close:
+                connection.close()
+        return row is not None
+
+
+class SqliteStorage:
+    """
+    Embedded single-file database with the transactions, new_transactions and table_updates tables.
+    """
+    name = 'sqlite'
+    placeholder = '?'
+    unique_index = 'ux_transactions_id'
+    busy_timeout = 60
+    staging_schema = "CREATE TABLE IF NOT EXISTS {} (id VARCHAR(32), date TIMESTAMP, trans_date TIMESTAMP, " \
+                     "vendor TEXT, location TEXT, amount REAL, account TEXT, category TEXT, ml INTEGER);"
+    schema = ["CREATE TABLE IF NOT EXISTS transactions (id VARCHAR(32) PRIMARY KEY, date TIMESTAMP, "
+              "trans_date TIMESTAMP, vendor TEXT, location TEXT, amount REAL, account TEXT, category TEXT, "
+              "ml INTEGER);",
+              staging_schema.format('new_transactions'),
+              "CREATE TABLE IF NOT EXISTS table_updates (update_id VARCHAR(128) PRIMARY KEY, "
+              "target_table VARCHAR(128), inserted TIMESTAMP DEFAULT CURRENT_TIMESTAMP);"]
+
+    def __init__(self, path):
+        self.path = path
+        self._engine = None
+        connection = self.connect()
+        for qry in self.schema:
+            connection.execute(qry)
+        connection.commit()
+        connection.close()
+
+    def connect(self):
+        # concurrent loads take turns on the database lock rather than failing straight away:
+        return sqlite3.connect(self.path, timeout=self.busy_timeout)
+
+    def engine(self):
+        if self._engine is None:
+            self._engine = create_engine('sqlite:///{}'.format(self.path),
+                                         connect_args={'timeout': self.busy_timeout})
+        return self._engine
+
+    def target(self, table, update_id):
+        return SqliteTarget(self, table, update_id)
+
+    def read_transactions(self, qry='SELECT * FROM transactions;'):
+        transactions_df = pd.read_sql(qry, self.engine())
+        # PaypalUtils stores its dates as 'YYYY/MM/DD' strings, which MySQL converts and SQLite keeps as they are.
+        for column in ['date', 'trans_date']:
+            if column in transactions_df:
+                dates = transactions_df[column].str.replace('/', '-')
+                transactions_df[column] = pd.to_datetime(dates, format='ISO8601')
+        return transactions_df
+
+    def read_staged(self, staging_table):
+        """
+        :return: the rows of transactions whose id is in staging_table, as stored after promote/update.
+        """
+        return self.read_transactions('SELECT * FROM transactions WHERE id IN (SELECT id FROM {});'
+                                      .format(staging_table))
+
+    def execute(self, qry):
+        connection = self.connect()
+        try:
+            rowcount = connection.execute(qry).rowcount
+            connection.commit()
+        finally:
+            connection.close()
+        return rowcount
+
+    def truncate(self, connection, table):
+        connection.execute('DELETE FROM {};'.format(table))
+        connection.commit()
+
+    def create_staging(self, connection, table):
+        connection.execute('DROP TABLE IF EXISTS {};'.format(table))
+        connection.execute(self.staging_schema.format(table))
+        connection.commit()
+
+    def drop_staging(self, connection, table):
+        connection.execute('DROP TABLE IF EXISTS {};'.format(table))
+        connection.commit()
+
+    def stage(self, connection, table, columns, rows, strategy='executemany', bulk_size=10000):
+        if strategy == 'load_data':
+            return sqlite_load_file(connection, table, columns, rows)
+        return executemany_load(connection, table, columns, rows, bulk_size, placeholder='?')
+
+    def ensure_unique_id(self, connection):
+        connection.execute('CREATE UNIQUE INDEX IF NOT EXISTS {} ON transactions (id);'.format(self.unique_index))
+
+    def promote(self, connection, staging_table, mode='anti_join'):
+        if mode == 'insert_ignore':
+            self.ensure_unique_id(connection)
+            qry = "INSERT OR IGNORE INTO transactions SELECT * FROM {};".format(staging_table)
+        else:
+            qry = "INSERT INTO transactions " \
+                  "SELECT B.* FROM {} B LEFT JOIN transactions A on A.id = B.id WHERE A.id is NULL;" \
+                  .format(staging_table)
+        rowcount = connection.execute(qry).rowcount
+        connection.commit()
+        return rowcount
+
+    def update_categories(self, staging_table):
+        return self.execute("UPDATE transactions SET category = b.category FROM {} b WHERE transactions.id = b.id;"
+                            .format(staging_table))
+
+
+def write_back_categories(backend, connection, table, categories_df, strategy='executemany'):
+    """
+    Stage only the (id, category) pairs of categories_df in table and copy them onto transactions, instead of
+    every column of every row. The predictions of ClassifyUnknownTransactions are all for transactions without a
+    category, so each one is a change and the write-back is bounded by the uncategorised transactions.
+    :param table: staging table made by create_staging.
+    :return: number of transactions updated.
+    """
+    rows = categories_df[['id', 'category']].itertuples(index=False, name=None)
+    backend.stage(connection, table, ['id', 'category'], rows, strategy)
+    connection.commit()
+    return backend.update_categories(table)
+
+
+_backends = {}
+
+
+def get_storage():
+    """
+    Return the backend selected in [storage], shared by everything in the process.
+    """
+    settings = storage()
+    key = (settings.backend, settings.sqlite_path)
+    if key not in _backends:
+        if settings.backend == 'sqlite':
+            _backends[key] = SqliteStorage(settings.sqlite_path)
+        else:
+            _backends[key] = MySqlStorage()
+    return _backends[key]
@@ -1,12 +1,18 @@
 import pandas as pd
 import numpy as np
-from sqlalchemy import create_engine
+import pyarrow.dataset as ds
+from transaction_classifier.storage import get_storage
+from transaction_classifier.archive import get_archive
 
 
-qry = "SELECT * FROM banking_db.transactions where category='GROCERIES';"
+qry = "SELECT * FROM transactions where category='GROCERIES';"
 
-engine = create_engine("mysql://root:@localhost/banking_db")
-transactions_df = pd.read_sql(qry, engine, parse_dates=True)
+transaction_archive = get_archive()
+if transaction_archive is not None:
+    transactions_df = transaction_archive.read(columns=['trans_date', 'amount', 'category'],
+                                               filter=ds.field('category') == 'GROCERIES')
+else:
+    transactions_df = get_storage().read_transactions(qry)
 transactions_df = transactions_df.fillna(value=np.nan)
 transactions_df = transactions_df.sort_values(by='trans_date')
 
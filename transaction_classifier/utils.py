@@ -1,4 +1,7 @@
 import csv
+import codecs
+import io
+import locale
 import re
 import hashlib
 import json
@@ -6,8 +9,15 @@ from selenium import webdriver
 import datetime
 import os
 import logging
+import tempfile
 import dateutil.parser
 import pandas as pd
+import numpy as np
+from collections import OrderedDict
+from json.encoder import encode_basestring_ascii
+
+
+logger = logging.getLogger(__name__)
 
 
 def configure_logging():
@@ -32,6 +42,211 @@ def import_csv(input_file):
         return content
 
 
+def import_csv_frame(input_file, encoding='utf-8', columns=()):
+    """
+    Read a bank export into a DataFrame of strings, keeping empty fields as '' so that each record is the same dict
+    csv.DictReader would have produced.
+    :param columns: columns of the frame returned for an empty export, which csv.DictReader reads as no rows.
+    """
+    try:
+        return pd.read_csv(input_file, dtype=str, keep_default_na=False, encoding=encoding)
+    except pd.errors.EmptyDataError:
+        return pd.DataFrame(columns=list(columns), dtype=object)
+
+
+def frame_rows(frame):
+    """
+    Yield the rows of a formatted frame as tuples of plain python values, in the same form rows() yields them from
+    format_transaction.
+    """
+    columns = []
+    for name in frame.columns:
+        column = frame[name]
+        if pd.api.types.is_datetime64_any_dtype(column):
+            columns.append(list(column.dt.to_pydatetime()))
+        else:
+            columns.append(column.tolist())
+    return zip(*columns)
+
+
+def clean_amounts(amounts):
+    """
+    Vectorised equivalent of round(float(amount.replace(',', '')), 2). Empty strings become NaN.
+    """
+    values = amounts.str.replace(',', '', regex=False).replace('', np.nan).astype(float)
+    # python's round rather than np.round, which can differ in the last decimal place.
+    return pd.Series([round(value, 2) for value in values.tolist()], index=amounts.index, dtype=float)
+
+
+# strings pd.read_csv reads as NaN by default.
+PANDAS_NA_VALUES = {'', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN', '<NA>',
+                    'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'}
+
+INT_PATTERN = re.compile(r'\s*[+-]?\d+\s*')
+FLOAT_PATTERN = re.compile(r'\s*[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?\s*')
+
+
+class PandasRoundTrip:
+    """
+    Reproduces, one row at a time, the strings csv.DictReader used to see after an export had been rewritten with
+    pd.read_csv(...).to_csv(...): NA markers are written back as '', and numeric columns are written the way pandas
+    formats them (e.g. '5' becomes '5.0' in a column that also has blanks). Transaction ids are hashed from these
+    strings, so they have to stay the same for dedup against the transactions table.
+
+    Column types are inferred with a first pass over the rows (observe), so memory does not grow with the export.
+    """
+
+    def __init__(self, n_columns):
+        self.kinds = ['empty'] * n_columns
+        self.has_na = [False] * n_columns
+
+    @classmethod
+    def from_frame(cls, df):
+        """
+        Column types of a frame pd.read_csv has already inferred them for, instead of a pass of observe.
+        """
+        round_trip = cls(len(df.columns))
+        if len(df):
+            for i, name in enumerate(df.columns):
+                dtype = df[name].dtype
+                round_trip.kinds[i] = ('int' if pd.api.types.is_integer_dtype(dtype) else
+                                       'float' if pd.api.types.is_float_dtype(dtype) else 'object')
+        return round_trip
+
+    def observe(self, row):
+        for i, value in enumerate(row[:len(self.kinds)]):
+            kind = self.kinds[i]
+            if value in PANDAS_NA_VALUES:
+                self.has_na[i] = True
+            elif kind == 'object':
+                continue
+            elif kind in ('empty', 'int') and INT_PATTERN.fullmatch(value):
+                self.kinds[i] = 'int'
+            elif FLOAT_PATTERN.fullmatch(value):
+                self.kinds[i] = 'float'
+            else:
+                self.kinds[i] = 'object'
+
+    def _column_kind(self, i):
+        kind = self.kinds[i]
+        if kind == 'int' and self.has_na[i]:
+            return 'float'
+        if kind == 'empty':
+            return 'float'
+        return kind
+
+    def format_row(self, row):
+        formatted = []
+        for i, value in enumerate(row):
+            if value in PANDAS_NA_VALUES:
+                formatted.append('')
+            elif i >= len(self.kinds):
+                formatted.append(value)
+            else:
+                kind = self._column_kind(i)
+                try:
+                    if kind == 'int':
+                        formatted.append(str(int(value)))
+                    elif kind == 'float':
+                        formatted.append(repr(float(value)))
+                    else:
+                        formatted.append(value)
+                except ValueError:
+                    # only for a row that was not observed, e.g. the first NAB row.
+                    formatted.append(value)
+        return formatted
+
+
+def stringify_frame(df):
+    """
+    Turn a frame read by pd.read_csv with type inference back into the strings to_csv would have written, so it
+    matches PandasRoundTrip row for row.
+    """
+    str_df = pd.DataFrame(index=df.index)
+    for name in df.columns:
+        column = df[name]
+        if pd.api.types.is_float_dtype(column):
+            str_df[name] = column.astype(str).where(column.notna(), '').astype(object)
+        else:
+            str_df[name] = column.astype(object).where(column.notna(), '').astype(str).astype(object)
+    return str_df
+
+
+# what open() and luigi's LocalTarget.open('r') decode exports with when no encoding is given.
+LOCAL_ENCODING = locale.getpreferredencoding(False)
+
+
+class CsvLayout:
+    """
+    Where the transactions start in an export and how each csv row becomes the raw dict passed to format_transaction.
+
+    Rows are read line by line from a byte offset, so an export can be streamed whole or split into byte ranges on line
+    boundaries for parallel parsing. This assumes no field contains a line break, which holds for the bank exports.
+    """
+
+    def __init__(self, fieldnames, data_start, encoding, round_trip=None, keep_row=None, restval=None):
+        """
+        :param fieldnames: column names, as csv.DictReader would give them.
+        :param data_start: byte offset of the first transaction.
+        :param round_trip: optional PandasRoundTrip applied to every row.
+        :param keep_row: optional predicate on the raw dict; rows it rejects are skipped.
+        :param restval: value for columns missing from a short row (csv.DictReader uses None).
+        """
+        self.fieldnames = fieldnames
+        self.data_start = data_start
+        self.encoding = encoding
+        self.round_trip = round_trip
+        self.keep_row = keep_row
+        self.restval = restval
+
+    @staticmethod
+    def read_header(filename, encoding):
+        """
+        :return: (first row of the file, byte offset just after it). The row is None for an empty file.
+        """
+        with open(filename, 'rb') as csv_file:
+            line = csv_file.readline()
+            offset = csv_file.tell()
+        if encoding == 'utf-8-sig' and line.startswith(codecs.BOM_UTF8):
+            line = line[len(codecs.BOM_UTF8):]
+        return next(csv.reader([line.decode(encoding)]), None), offset
+
+    def _lines(self, csv_file, end):
+        encoding = 'utf-8' if self.encoding == 'utf-8-sig' else self.encoding
+        while end is None or csv_file.tell() < end:
+            line = csv_file.readline()
+            if not line:
+                break
+            yield line.decode(encoding)
+
+    def raw_rows(self, filename, start=None, end=None):
+        """
+        Yield the csv rows between two byte offsets (by default the whole export) as lists of strings.
+        """
+        with open(filename, 'rb') as csv_file:
+            csv_file.seek(self.data_start if start is None else start)
+            for row in csv.reader(self._lines(csv_file, end), delimiter=','):
+                if row:
+                    yield row
+
+    def rows(self, filename, start=None, end=None):
+        """
+        Yield the raw transaction dicts between two byte offsets (by default the whole export).
+        """
+        n_fields = len(self.fieldnames)
+        for row in self.raw_rows(filename, start, end):
+            if self.round_trip is not None:
+                row = self.round_trip.format_row(row)
+            raw_transaction = dict(zip(self.fieldnames, row))
+            if n_fields < len(row):
+                raw_transaction[None] = row[n_fields:]
+            elif n_fields > len(row):
+                for key in self.fieldnames[len(row):]:
+                    raw_transaction[key] = self.restval
+            if self.keep_row is None or self.keep_row(raw_transaction):
+                yield raw_transaction
+
+
 def setup_webdriver(run_id):
     driver_binary = "C:/Support/chromedriver-2.41.exe"
     options = webdriver.ChromeOptions()
@@ -56,19 +271,371 @@ def setup_webdriver(run_id):
     return driver
 
 
+class SeedWordMatcher:
+    """
+    Aho-Corasick automaton over the upper-cased seed words of every category.
+
+    Each state stores the lowest category index (i.e. first in file order) of any seed word ending there or at one
+    of its suffix states, so a single pass over the vendor gives the same answer as checking every category in turn.
+    """
+
+    def __init__(self, seed_words):
+        """
+        :param seed_words: one sequence of seed words per category, in file order.
+        """
+        self._goto = [{}]
+        self._fail = [0]
+        self._best = [None]
+        for idx, category_seed_words in enumerate(seed_words):
+            for seed_word in category_seed_words:
+                self._add(seed_word.upper(), idx)
+        self._build()
+
+    def _add(self, word, idx):
+        state = 0
+        for char in word:
+            nxt = self._goto[state].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._best.append(None)
+            state = nxt
+        if self._best[state] is None or idx < self._best[state]:
+            self._best[state] = idx
+
+    def _build(self):
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for char, nxt in self._goto[state].items():
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(char, 0)
+                self._fail[nxt] = fail if fail != nxt else 0
+                inherited = self._best[self._fail[nxt]]
+                if inherited is not None and (self._best[nxt] is None or inherited < self._best[nxt]):
+                    self._best[nxt] = inherited
+                queue.append(nxt)
+
+    def match(self, text):
+        """
+        :param text: upper-cased text to search.
+        :return: index of the first category with a seed word contained in text, or None.
+        """
+        goto, fail, best = self._goto, self._fail, self._best
+        state = 0
+        result = best[0]
+        for char in text:
+            if result == 0:
+                break
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            found = best[state]
+            if found is not None and (result is None or found < result):
+                result = found
+        return result
+
+
+class CategoryCache:
+    """
+    Bounded LRU memo of normalised vendor -> category that sits in front of the rule matcher.
+
+    The entries are saved as JSON next to categories.csv together with the md5 of the rules file, so they survive
+    between pipeline runs and are thrown away as soon as the rules change.
+    """
+
+    def __init__(self, filename, categories_hash, maxsize=10000):
+        self.filename = filename
+        self.categories_hash = categories_hash
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        # entries added by misses since take_new, for a parse worker to hand back to its parent:
+        self._new = []
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.filename, 'r', encoding='UTF-8') as cache_file:
+                data = json.load(cache_file)
+        except (OSError, ValueError):
+            return
+
+        if data.get('categories_hash') != self.categories_hash:
+            logger.info('categories file has changed, discarding category cache %s', self.filename)
+            return
+
+        for vendor, category in data.get('entries', [])[-self.maxsize:]:
+            self._entries[vendor] = category
+
+    def get(self, vendor, categorise):
+        """
+        :param vendor: normalised vendor string.
+        :param categorise: callable used to categorise the vendor on a cache miss.
+        :return: category or None.
+        """
+        try:
+            category = self._entries[vendor]
+        except KeyError:
+            self.misses += 1
+            category = categorise(vendor)
+            self._entries[vendor] = category
+            self._new.append((vendor, category))
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            return category
+
+        self.hits += 1
+        self._entries.move_to_end(vendor)
+        return category
+
+    def take_new(self):
+        """
+        :return: (vendor, category) entries added by cache misses since the last call.
+        """
+        new, self._new = self._new, []
+        return new
+
+    def merge(self, entries):
+        """
+        Add (vendor, category) entries found by another process, e.g. the parse workers of parallel_rows.
+        """
+        for vendor, category in entries:
+            self._entries[vendor] = category
+            self._entries.move_to_end(vendor)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def save(self):
+        data = {'categories_hash': self.categories_hash,
+                'entries': [[vendor, category] for vendor, category in self._entries.items()]}
+        # each writer gets its own temp file, since the processors of a run save the cache concurrently:
+        fd, tmp_filename = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.filename)),
+                                            prefix=os.path.basename(self.filename) + '.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='UTF-8') as cache_file:
+                json.dump(data, cache_file)
+            os.replace(tmp_filename, self.filename)
+        except BaseException:
+            os.remove(tmp_filename)
+            raise
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+                'hit_rate': self.hits / lookups if lookups else 0.0}
+
+
+_category_caches = {}
+
+
+def get_category_cache(categories_file, categories_hash):
+    """
+    Return the CategoryCache for a rules file, creating it on first use so that every Utils class in the process
+    shares the same memo.
+    """
+    key = (categories_file, categories_hash)
+    if key not in _category_caches:
+        cache_file = os.path.join(os.path.dirname(categories_file), 'category_cache.json')
+        _category_caches[key] = CategoryCache(cache_file, categories_hash)
+    return _category_caches[key]
+
+
+class RuleIndex:
+    """
+    Compiled, read-only form of a categories.csv: the category names in file order, their seed words and the
+    SeedWordMatcher built from them.
+    """
+
+    def __init__(self, filename, stamp=None):
+        with open(filename, 'rb') as categories_file:
+            content = categories_file.read()
+
+        self.filename = filename
+        self.stamp = stamp
+        self.categories_hash = hashlib.md5(content).hexdigest()
+
+        categories_csv_reader = csv.DictReader(io.StringIO(content.decode('UTF-8')), delimiter=',')
+        categories = []
+        seed_words = []
+        for line in categories_csv_reader:
+            categories.append(line['Category'])
+            seed_words.append(tuple(word.strip() for word in line['SeedWords'].split(',')))
+        self.categories = tuple(categories)
+        self.seed_words = tuple(seed_words)
+
+        self.matcher = SeedWordMatcher(self.seed_words)
+
+    def categorise(self, vendor):
+        """
+        :param vendor: normalised (upper-cased) vendor string.
+        :return: the first category in file order with a seed word in vendor, or None.
+        """
+        idx = self.matcher.match(vendor)
+        if idx is None:
+            return None
+        return self.categories[idx]
+
+
+_rule_indexes = {}
+
+
+def load_rule_index(categories_file):
+    """
+    Process-wide rule registry. Every caller gets the same RuleIndex for a rules file; it is only rebuilt when the
+    file's modification time or size has changed since it was loaded.
+    """
+    stat = os.stat(categories_file)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    index = _rule_indexes.get(categories_file)
+    if index is None or index.stamp != stamp:
+        if index is not None:
+            logger.info('%s has changed, reloading category rules', categories_file)
+        index = _rule_indexes[categories_file] = RuleIndex(categories_file, stamp)
+    return index
+
+
+class DateParser:
+    """
+    Memoised date parsing for one export.
+
+    The first of formats that parses a value is remembered and tried first from then on, and each distinct string is
+    only parsed once. Values that match none of the formats go to dateutil when fallback is set, otherwise they raise
+    ValueError just like strptime.
+    """
+
+    def __init__(self, formats=(), fallback=False):
+        self.formats = list(formats)
+        self.fallback = fallback
+        self.format = None
+        self._cache = {}
+
+    def _parse(self, value):
+        formats = self.formats
+        if self.format:
+            formats = [self.format] + [fmt for fmt in formats if fmt != self.format]
+
+        text = value.strip()
+        for fmt in formats:
+            try:
+                parsed = datetime.datetime.strptime(text, fmt)
+            except ValueError:
+                continue
+            if self.format is None:
+                self.format = fmt
+            return parsed
+
+        if self.fallback:
+            return dateutil.parser.parse(value)
+        raise ValueError('time data {!r} does not match any of {}'.format(value, self.formats))
+
+    def parse(self, value):
+        try:
+            return self._cache[value]
+        except KeyError:
+            parsed = self._cache[value] = self._parse(value)
+            return parsed
+
+    def parse_series(self, values):
+        """
+        Vectorised parse: each distinct string in the series is parsed once.
+        :return: datetime64 series.
+        """
+        lookup = {value: self.parse(value) for value in values.unique()}
+        return pd.to_datetime(values.map(lookup))
+
+
+class TransactionIdEngine:
+    """
+    Calculates transaction ids from the raw export row, one row at a time or for a whole block of rows.
+
+    'legacy' mode reproduces md5(json.dumps(row, sort_keys=True)) exactly, so ids match the ones already stored in
+    the transactions table. 'native' mode skips the JSON encoding and hashes a simple separator-delimited encoding of
+    the sorted fields with blake2b; it is faster but gives different ids, so only use it for a fresh database.
+    """
+    modes = ('legacy', 'native')
+
+    def __init__(self, mode='legacy'):
+        if mode not in self.modes:
+            raise ValueError('unknown transaction id mode: {}'.format(mode))
+        self.mode = mode
+
+    @staticmethod
+    def _json_value(value):
+        if isinstance(value, str):
+            return encode_basestring_ascii(value)
+        return json.dumps(value)
+
+    @staticmethod
+    def _native_value(value):
+        if isinstance(value, str):
+            return value
+        return '\x1d' + json.dumps(value)
+
+    def _hash(self, encoded):
+        if self.mode == 'legacy':
+            return hashlib.md5(encoded.encode('utf-8')).hexdigest()
+        return hashlib.blake2b(encoded.encode('utf-8'), digest_size=16).hexdigest()
+
+    def _encode_columns(self, keys, columns):
+        """
+        :param keys: field names, already sorted.
+        :param columns: one sequence of raw values per key.
+        :return: the canonical string of each row.
+        """
+        if self.mode == 'legacy':
+            # identical to json.dumps(row, sort_keys=True) with its default separators.
+            prefixes = [encode_basestring_ascii(key) + ': ' for key in keys]
+            encoded = [[prefix + self._json_value(value) for value in column] for prefix, column in zip(prefixes, columns)]
+            return ['{' + ', '.join(row) + '}' for row in zip(*encoded)]
+
+        prefixes = [key + '\x1f' for key in keys]
+        encoded = [[prefix + self._native_value(value) for value in column] for prefix, column in zip(prefixes, columns)]
+        return ['\x1e'.join(row) for row in zip(*encoded)]
+
+    def row_id(self, raw_transaction):
+        if self.mode == 'legacy':
+            return self._hash(json.dumps(raw_transaction, sort_keys=True))
+        keys = sorted(raw_transaction)
+        return self._hash('\x1e'.join(key + '\x1f' + self._native_value(raw_transaction[key]) for key in keys))
+
+    def frame_ids(self, raw_df):
+        """
+        :param raw_df: export read with import_csv_frame.
+        :return: list of ids, one per row.
+        """
+        if raw_df.empty:
+            return []
+        keys = sorted(raw_df.columns)
+        encoded = self._encode_columns(keys, [raw_df[key].tolist() for key in keys])
+        return [self._hash(row) for row in encoded]
+
+
 class TransactionClassifier:
     categories = 'C:\\Users\\paul_\\OneDrive\\Documents\\version_control\\transaction_classifier\\transactions\\categories.csv'
 
-    def __init__(self):
-        # import categories:
-        with open(self.categories, "r", encoding='UTF-8') as categories_csv_file:
-            categories_csv_reader = csv.DictReader(categories_csv_file, delimiter=',')
-            self.categories_list = [line for line in categories_csv_reader]
-            for cat in self.categories_list:
-                cat['SeedWords'] = cat['SeedWords'].split(',')
-                cat['SeedWords'] = [word.strip() for word in cat['SeedWords']]
+    def __init__(self, categories=None, use_cache=True):
+        if categories:
+            self.categories = categories
+
+        # import categories (shared with every other classifier using the same file):
+        self.rules = load_rule_index(self.categories)
+
+        if use_cache:
+            self.cache = get_category_cache(self.categories, self.rules.categories_hash)
+        else:
+            self.cache = None
 
-        categories_csv_file.close()
+    @property
+    def categories_list(self):
+        return [{'Category': category, 'SeedWords': list(seed_words)}
+                for category, seed_words in zip(self.rules.categories, self.rules.seed_words)]
 
     def categorise_transaction(self, transaction):
         vendor = transaction['vendor']
@@ -84,15 +651,34 @@ class TransactionClassifier:
         #     if match:
         #         return category['Category']
 
-        # try matching phrase:
+        # try matching phrase (first category in file order wins):
         vendor = vendor.upper().replace("'", '').strip()
 
-        for category in self.categories_list:
-            for seed_word in category['SeedWords']:
-                if seed_word.upper() in vendor:
-                    return category['Category']
+        if self.cache is not None:
+            return self.cache.get(vendor, self.rules.categorise)
+        return self.rules.categorise(vendor)
 
-        return None
+    def categorise_vendors(self, vendors):
+        """
+        Categorise a column of vendors, looking each distinct vendor up only once.
+
+        :param vendors: iterable of vendor strings (or None).
+        :return: list of categories in the same order.
+        """
+        vendors = list(vendors)
+        lookup = {vendor: self.categorise_transaction({'vendor': vendor}) for vendor in set(vendors)}
+        return [lookup[vendor] for vendor in vendors]
+
+    def save_cache(self):
+        """
+        Persist the vendor cache and log how much rule evaluation it saved.
+        """
+        if self.cache is None:
+            return
+        self.cache.save()
+        stats = self.cache.stats()
+        logger.info('category cache: %d hits, %d misses, %d entries (hit rate %.1f%%)',
+                    stats['hits'], stats['misses'], stats['size'], 100 * stats['hit_rate'])
 
 
 class IngUtils:
@@ -106,25 +692,55 @@ class IngUtils:
                       'trans_date': '(?<=Date)(.*?)(?=Card|Time)',
                       'card': '(?<=Card)(.*?)',
                       'to': '(?<=To).+$'}
+    ing_desc_patterns = {k: re.compile(v) for (k, v) in ing_desc_regex.items()}
 
-    def __init__(self):
-        self.classifier = TransactionClassifier()
+    # every marker used by ing_desc_regex. None of them can overlap another, so one finditer sees them all in order.
+    ing_desc_tokens = re.compile('-|Receipt|In|To|Date|Card|Time')
+
+    header = ['Date', 'Description', 'Credit', 'Debit', 'Balance']
+    encoding = LOCAL_ENCODING
+
+    def __init__(self, id_mode='legacy', categories=None):
+        self.classifier = TransactionClassifier(categories)
+        self.id_engine = TransactionIdEngine(id_mode)
+        self.date_parser = DateParser(['%d/%m/%Y'])
+        # the date embedded in the description is free text, so anything unexpected goes to dateutil:
+        self.trans_date_parser = DateParser(['%d %b %Y', '%d %B %Y'], fallback=True)
+
+    @classmethod
+    def csv_layout(cls, filename):
+        header, data_start = CsvLayout.read_header(filename, cls.encoding)
+        return CsvLayout(header or [], data_start, cls.encoding)
+
+    def read_rows(self, filename):
+        """
+        Stream the raw transactions of an ING export as dicts, the same as csv.DictReader.
+        """
+        return self.csv_layout(filename).rows(filename)
+
+    def read_frame(self, filename):
+        """
+        read_rows for the format_frame path.
+        """
+        return import_csv_frame(filename, encoding=self.encoding, columns=self.header)
 
     @staticmethod
-    def _get_string(regex, text):
-        pattern = re.compile(regex)
+    def _get_string(pattern, text):
         try:
             return pattern.search(text).group()
-        except:
+        except AttributeError:
             return None
 
     def calc_transaction_id(self, raw_transaction):
-        return hashlib.md5(json.dumps(raw_transaction, sort_keys=True).encode('utf-8')).hexdigest()
+        return self.id_engine.row_id(raw_transaction)
 
     @staticmethod
     def _locate_dash(desc):
         """
         This method is used to remove unhelpful dashes that exist in the raw description, such as '7-ELEVEN'.
+
+        Each replacement is made on the original string, so when more than one of d_strings is present only the last
+        one found is blanked out.
         :param desc:
         :return:
         """
@@ -133,35 +749,84 @@ class IngUtils:
         for d_string in d_strings:
             idx = desc.find(d_string)
             if idx > -1:
-                desc_list = list(desc)
-                desc_list[idx + 1] = ' '
-                desc_ret = "".join(desc_list)
+                desc_ret = desc[:idx + 1] + ' ' + desc[idx + 2:]
         return desc_ret
 
+    def _parse_ing_description_regex(self, description):
+        return {k: self._get_string(v, description) for (k, v) in self.ing_desc_patterns.items()}
+
     def parse_ing_description(self, description: str):
         """
         The description field in the raw ING files comes as a continuous descriptive string separated with dashes.
-        This method parses the raw description string using regex.
+        This method finds every marker in one pass over the string and slices the fields out between them, giving the
+        same result as searching with each of ing_desc_regex in turn.
 
         :param description: raw descriptive string containing dashes.
         :return: description as dict.
         """
         description = self._locate_dash(description)
-        description_dict = {k: self._get_string(v, description) for (k, v) in self.ing_desc_regex.items()}
-        return description_dict
+        if '\n' in description:
+            # '.' in ing_desc_regex stops at line breaks, which the slicing below does not model.
+            return self._parse_ing_description_regex(description)
+
+        dashes = []
+        receipt_start = receipt_end = None
+        location_start = location_end = None
+        date_start = date_end = None
+        card = to_start = None
+
+        for match in self.ing_desc_tokens.finditer(description):
+            token = match.group()
+            start = match.start()
+            if token == '-':
+                if len(dashes) < 2:
+                    dashes.append(start)
+                continue
+            if token == 'Receipt':
+                if receipt_start is None:
+                    receipt_start = match.end()
+                continue
+            if receipt_start is not None and receipt_end is None and token in ('In', 'To', 'Date'):
+                receipt_end = start
+            if token == 'In':
+                if location_start is None:
+                    location_start = match.end()
+            elif token == 'To':
+                if to_start is None:
+                    to_start = match.end()
+            elif token == 'Date':
+                if location_start is not None and location_end is None:
+                    location_end = start
+                if date_start is None:
+                    date_start = match.end()
+            else:
+                if date_start is not None and date_end is None:
+                    date_end = start
+                if token == 'Card':
+                    card = ''
+
+        return {'vendor': description[:dashes[0]] if dashes else None,
+                'type': description[dashes[0] + 1:dashes[1]] if len(dashes) > 1 else None,
+                'receipt': description[receipt_start:receipt_end] if receipt_end is not None else None,
+                'location': description[location_start:location_end] if location_end is not None else None,
+                'trans_date': description[date_start:date_end] if date_end is not None else None,
+                'card': card,
+                'to': description[to_start:] if to_start is not None and to_start < len(description) else None}
 
-    def format_transaction(self, raw_transaction):
+    def format_transaction(self, raw_transaction, transaction_id=None):
         """
         Place the current transaction in a format suitable for uploading to the db.
+        :param transaction_id: calc_transaction_id of raw_transaction when the caller has computed it already.
         :return:
         """
         new_description = self.parse_ing_description(raw_transaction['Description'])
 
         transaction_output = {}
-        transaction_output['id'] = self.calc_transaction_id(raw_transaction)
-        transaction_output['date'] = datetime.datetime.strptime(raw_transaction['Date'], '%d/%m/%Y')
+        transaction_output['id'] = (self.calc_transaction_id(raw_transaction) if transaction_id is None
+                                    else transaction_id)
+        transaction_output['date'] = self.date_parser.parse(raw_transaction['Date'])
         if new_description['trans_date']:
-            transaction_output['trans_date'] = dateutil.parser.parse(new_description['trans_date'])
+            transaction_output['trans_date'] = self.trans_date_parser.parse(new_description['trans_date'])
         else:
             transaction_output['trans_date'] = transaction_output['date']
         transaction_output['vendor'] = new_description['vendor']
@@ -183,6 +848,37 @@ class IngUtils:
 
         return transaction_output
 
+    def format_frame(self, raw_df, ids=None):
+        """
+        DataFrame equivalent of format_transaction for a whole export read with import_csv_frame.
+        :param ids: id_engine.frame_ids of raw_df when the caller has computed them already.
+        :return: formatted frame with one column per transaction field.
+        """
+        descriptions = [self.parse_ing_description(description) for description in raw_df['Description']]
+
+        transactions_df = pd.DataFrame(index=raw_df.index)
+        transactions_df['id'] = self.id_engine.frame_ids(raw_df) if ids is None else ids
+        transactions_df['date'] = self.date_parser.parse_series(raw_df['Date'])
+
+        trans_dates = pd.Series([d['trans_date'] for d in descriptions], index=raw_df.index, dtype=object)
+        has_trans_date = trans_dates.astype(bool)
+        transactions_df['trans_date'] = transactions_df['date']
+        transactions_df.loc[has_trans_date, 'trans_date'] = self.trans_date_parser.parse_series(trans_dates[has_trans_date])
+
+        transactions_df['vendor'] = pd.Series([d['vendor'] for d in descriptions], index=raw_df.index, dtype=object)
+        transactions_df['location'] = pd.Series([d['location'] for d in descriptions], index=raw_df.index, dtype=object)
+
+        # derive 'amount', Credit taking precedence over Debit:
+        amounts = raw_df['Credit'].where(raw_df['Credit'] != '', raw_df['Debit'])
+        transactions_df['amount'] = clean_amounts(amounts)
+
+        transactions_df['account'] = 'ing'
+        categories = self.classifier.categorise_vendors(transactions_df['vendor'])
+        transactions_df['category'] = pd.Series(categories, index=raw_df.index, dtype=object)
+        transactions_df['ml'] = [0 if category else 1 for category in categories]
+
+        return transactions_df
+
     def validate_transaction(self, processed_transaction):
         """
         Check that the transaction is ok to add to the dataframe.
@@ -199,30 +895,73 @@ class IngUtils:
         else:
             return False
 
+    def validate_frame(self, transactions_df):
+        """
+        Vectorised validate_transaction.
+        :return: boolean mask of the rows that are ok to upload.
+        """
+        restricted_transactions = ['PAYPAL', 'visa', 'Transfer', 'Plm payment', 'CC payment']
+
+        vendors = transactions_df['vendor'].fillna('')
+        vendors_upper = vendors.str.upper()
+        mask = vendors != ''
+        for trans in restricted_transactions:
+            mask &= ~vendors_upper.str.contains(trans.upper(), regex=False)
+        return mask
+
 
 class NabUtils:
-    def __init__(self, account='nab_paul'):
-        self.classifier = TransactionClassifier()
+    header = ["Date", "Amount", "Card", " ", "Type", "Vendor", "Balance"]
+    encoding = LOCAL_ENCODING
+
+    def __init__(self, account='nab_paul', id_mode='legacy', categories=None):
+        self.classifier = TransactionClassifier(categories)
+        self.id_engine = TransactionIdEngine(id_mode)
+        self.date_parser = DateParser(['%d-%b-%y', '%d %b %y'])
         self.account = account
 
     def calc_transaction_id(self, raw_transaction):
-        return hashlib.md5(json.dumps(raw_transaction, sort_keys=True).encode('utf-8')).hexdigest()
+        return self.id_engine.row_id(raw_transaction)
 
-    def create_header(self, filename):
-        cols = ["Date", "Amount", "Card", " ", "Type", "Vendor", "Balance"]
-        nab_df = pd.read_csv(filename)
-        if (list(nab_df.columns) == cols):
-            return
-        nab_df.columns = ["Date", "Amount", "Card", " ", "Type", "Vendor", "Balance"]
-        nab_df.to_csv(filename, index=False)
+    @classmethod
+    def csv_layout(cls, filename):
+        first, data_start = CsvLayout.read_header(filename, cls.encoding)
+        if first == cls.header:
+            return CsvLayout(cls.header, data_start, cls.encoding)
+
+        # no header row: the first line is already a transaction. The old rewrite read it as the header, so it takes
+        # no part in inferring the column types, otherwise the ids of the other rows could change.
+        layout = CsvLayout(cls.header, 0, cls.encoding, round_trip=PandasRoundTrip(len(cls.header)), restval='')
+        for row in layout.raw_rows(filename, start=data_start):
+            layout.round_trip.observe(row)
+        return layout
+
+    def read_rows(self, filename):
+        """
+        Stream the raw transactions of a NAB export as dicts. NAB exports come without a header row, so the header is
+        injected here instead of rewriting the downloaded file. The first pass only infers the column types needed to
+        give the same values the old pandas rewrite did.
+        """
+        return self.csv_layout(filename).rows(filename)
+
+    def read_frame(self, filename):
+        """
+        read_rows for the format_frame path.
+        """
+        first, data_start = CsvLayout.read_header(filename, self.encoding)
+        if not first or first == self.header:
+            return import_csv_frame(filename, encoding=self.encoding, columns=self.header)
+        # as in csv_layout, the types are inferred without the first row, which is then formatted with them.
+        typed_df = pd.read_csv(filename, header=None, names=self.header, skiprows=1, encoding=self.encoding)
+        first = PandasRoundTrip.from_frame(typed_df).format_row(first)[:len(self.header)]
+        first_df = pd.DataFrame([first + [''] * (len(self.header) - len(first))], columns=self.header, dtype=object)
+        return pd.concat([first_df, stringify_frame(typed_df)], ignore_index=True)
 
-    def format_transaction(self, raw_transaction):
+    def format_transaction(self, raw_transaction, transaction_id=None):
         transaction_output = {}
-        transaction_output['id'] = self.calc_transaction_id(raw_transaction)
-        try:
-            transaction_output['date'] = datetime.datetime.strptime(raw_transaction['Date'], '%d-%b-%y')
-        except ValueError:
-            transaction_output['date'] = datetime.datetime.strptime(raw_transaction['Date'], '%d %b %y')
+        transaction_output['id'] = (self.calc_transaction_id(raw_transaction) if transaction_id is None
+                                    else transaction_id)
+        transaction_output['date'] = self.date_parser.parse(raw_transaction['Date'])
         transaction_output['trans_date'] = transaction_output['date']
         transaction_output['vendor'] = raw_transaction['Vendor']
         transaction_output['location'] = ''
@@ -236,33 +975,108 @@ class NabUtils:
 
         return transaction_output
 
+    def format_frame(self, raw_df, ids=None):
+        """
+        DataFrame equivalent of format_transaction for a whole export read with import_csv_frame.
+        :param ids: id_engine.frame_ids of raw_df when the caller has computed them already.
+        :return: formatted frame with one column per transaction field.
+        """
+        transactions_df = pd.DataFrame(index=raw_df.index)
+        transactions_df['id'] = self.id_engine.frame_ids(raw_df) if ids is None else ids
+        dates = self.date_parser.parse_series(raw_df['Date'])
+        transactions_df['date'] = dates
+        transactions_df['trans_date'] = dates
+        transactions_df['vendor'] = raw_df['Vendor'].astype(object)
+        transactions_df['location'] = ''
+        transactions_df['amount'] = clean_amounts(raw_df['Amount'])
+        transactions_df['account'] = self.account
+        categories = self.classifier.categorise_vendors(transactions_df['vendor'])
+        transactions_df['category'] = pd.Series(categories, index=raw_df.index, dtype=object)
+        transactions_df['ml'] = [0 if category else 1 for category in categories]
+
+        return transactions_df
+
     def validate_transaction(self, processed_transaction):
         if processed_transaction['vendor'] != 'CASH/TRANSFER PAYMENT - THANK YOU':
             return True
         else:
             return False
 
+    def validate_frame(self, transactions_df):
+        return transactions_df['vendor'] != 'CASH/TRANSFER PAYMENT - THANK YOU'
+
 
 class PaypalUtils:
-    def __init__(self):
-        self.classifier = TransactionClassifier()
+    encoding = 'utf-8-sig'
+
+    def __init__(self, id_mode='legacy', categories=None):
+        self.classifier = TransactionClassifier(categories)
+        self.id_engine = TransactionIdEngine(id_mode)
+        self.date_parser = DateParser(['%d/%m/%Y'])
 
     def calc_transaction_id(self, raw_transaction):
-        return hashlib.md5(json.dumps(raw_transaction, sort_keys=True).encode('utf-8')).hexdigest()
+        return self.id_engine.row_id(raw_transaction)
+
+    @staticmethod
+    def _keep_row(raw_transaction):
+        return raw_transaction['Status'] == 'Completed' and \
+            raw_transaction['Type'] in ('eBay Auction Payment', 'Express Checkout Payment')
+
+    @staticmethod
+    def _read_header(header):
+        """
+        Column names as pd.read_csv gives them: blanks become 'Unnamed: i' and repeats get a '.n' suffix.
+        """
+        names = []
+        for i, name in enumerate(header):
+            name = name or 'Unnamed: {}'.format(i)
+            if name in names:
+                n = 1
+                while '{}.{}'.format(name, n) in names:
+                    n += 1
+                name = '{}.{}'.format(name, n)
+            names.append(name)
+        return names
+
+    @classmethod
+    def csv_layout(cls, filename):
+        header, data_start = CsvLayout.read_header(filename, cls.encoding)
+        header = cls._read_header(header or [])
+        layout = CsvLayout(header, data_start, cls.encoding, round_trip=PandasRoundTrip(len(header)),
+                           keep_row=cls._keep_row, restval='')
+        for row in layout.raw_rows(filename):
+            layout.round_trip.observe(row)
+        return layout
 
-    def filter_rows(self, filename):
-        paypal_df = pd.read_csv(filename)
+    def read_rows(self, filename):
+        """
+        Stream the completed eBay and Express Checkout payments of a PayPal export as dicts, without rewriting the
+        downloaded file. The first pass only infers the column types needed to give the same values the old pandas
+        rewrite did.
+        """
+        return self.csv_layout(filename).rows(filename)
+
+    def read_frame(self, filename):
+        """
+        read_rows for the format_frame path.
+        """
+        try:
+            paypal_df = pd.read_csv(filename, encoding=self.encoding)
+        except pd.errors.EmptyDataError:
+            # read_rows yields no rows for an empty export.
+            return pd.DataFrame(columns=['Date', 'Name', 'Amount'], dtype=object)
         paypal_df = paypal_df[(paypal_df['Status'] == 'Completed') & ((paypal_df['Type'] == 'eBay Auction Payment') | (paypal_df['Type'] == 'Express Checkout Payment'))]
-        paypal_df.to_csv(filename, index=False, encoding='utf-8')
+        return stringify_frame(paypal_df)
 
-    def format_transaction(self, raw_transaction):
+    def format_transaction(self, raw_transaction, transaction_id=None):
         transaction_output = {}
-        transaction_output['id'] = self.calc_transaction_id(raw_transaction)
+        transaction_output['id'] = (self.calc_transaction_id(raw_transaction) if transaction_id is None
+                                    else transaction_id)
         try:
             raw_transaction['Date'] = raw_transaction['\ufeff"Date"']
         except KeyError:
             raw_transaction['Date'] = raw_transaction['Date']
-        transaction_output['date'] = datetime.datetime.strptime(raw_transaction['Date'], '%d/%m/%Y').strftime('%Y/%m/%d')
+        transaction_output['date'] = self.date_parser.parse(raw_transaction['Date']).strftime('%Y/%m/%d')
         transaction_output['trans_date'] = transaction_output['date']
         transaction_output['vendor'] = raw_transaction['Name']
         transaction_output['location'] = ''
@@ -276,9 +1090,34 @@ class PaypalUtils:
 
         return transaction_output
 
+    def format_frame(self, raw_df, ids=None):
+        """
+        DataFrame equivalent of format_transaction for a whole export read with import_csv_frame.
+        :param ids: id_engine.frame_ids of raw_df when the caller has computed them already.
+        :return: formatted frame with one column per transaction field.
+        """
+        date_col = '\ufeff"Date"' if '\ufeff"Date"' in raw_df.columns else 'Date'
+
+        transactions_df = pd.DataFrame(index=raw_df.index)
+        transactions_df['id'] = self.id_engine.frame_ids(raw_df) if ids is None else ids
+        transactions_df['date'] = self.date_parser.parse_series(raw_df[date_col]).dt.strftime('%Y/%m/%d').astype(object)
+        transactions_df['trans_date'] = transactions_df['date']
+        transactions_df['vendor'] = raw_df['Name'].astype(object)
+        transactions_df['location'] = ''
+        transactions_df['amount'] = clean_amounts(raw_df['Amount'])
+        transactions_df['account'] = 'paypal'
+        categories = self.classifier.categorise_vendors(transactions_df['vendor'])
+        transactions_df['category'] = pd.Series(categories, index=raw_df.index, dtype=object)
+        transactions_df['ml'] = [0 if category else 1 for category in categories]
+
+        return transactions_df
+
     def validate_transaction(self, processed_transaction):
         return True
 
+    def validate_frame(self, transactions_df):
+        return pd.Series(True, index=transactions_df.index)
+
 
 def rename_transaction_file(downloads_dir, run_id, type='ing', who='paul'):
     filelist = os.listdir(downloads_dir)
@@ -0,0 +1,128 @@
+"""
+Per-account high-water marks: the latest trans_date loaded for an account and the ids loaded on that date.
+
+Fetchers use them to ask the bank for a shorter date range and processors use them to drop rows that are older than
+what is already loaded before formatting them. Rows within lookback_days of the mark are still loaded and left to
+the normal dedup, because banks can post a purchase a few days after its transaction date.
+
+The cutoff is always compared with the posting date. trans_date can be well before it (ING takes it from the
+description, e.g. a hotel paid on the 3rd and posted on the 16th), so a row with an old trans_date may still be new.
+"""
+import datetime
+import logging
+
+import luigi
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+class watermarks(luigi.Config):
+    """
+    [watermarks] section of luigi.cfg.
+    """
+    enabled = luigi.BoolParameter(default=False)
+    lookback_days = luigi.IntParameter(default=7)
+
+
+WATERMARK_TABLE = 'CREATE TABLE IF NOT EXISTS watermarks (account VARCHAR(32) PRIMARY KEY, trans_date DATETIME, ' \
+                  'ids TEXT);'
+
+
+def as_datetime(value):
+    """
+    trans_date as a datetime, whether it came back as a datetime or as a string ('YYYY-MM-DD ...' or PayPal's
+    'YYYY/MM/DD').
+    """
+    if value is None or isinstance(value, datetime.datetime):
+        return value
+    if isinstance(value, datetime.date):
+        return datetime.datetime(value.year, value.month, value.day)
+    return pd.Timestamp(str(value).replace('/', '-')).to_pydatetime()
+
+
+class Watermark:
+    """
+    :param trans_date: latest trans_date loaded for the account.
+    :param ids: ids of the transactions loaded on trans_date.
+    """
+
+    def __init__(self, account, trans_date, ids, lookback_days=0):
+        self.account = account
+        self.trans_date = as_datetime(trans_date)
+        self.ids = frozenset(ids)
+        self.cutoff = self.trans_date - datetime.timedelta(days=lookback_days)
+
+    def __repr__(self):
+        return 'Watermark({}, {}, {} ids)'.format(self.account, self.trans_date, len(self.ids))
+
+    def before_cutoff(self, date):
+        """
+        True if a row with this posting date is certainly loaded already: its trans_date can only be earlier.
+        """
+        return date is not None and as_datetime(date) < self.cutoff
+
+    def is_loaded(self, date, trans_date, transaction_id):
+        """
+        True if a formatted row is loaded already: posted before the cutoff, or loaded on the watermark's trans_date.
+        :param date: posting date of the row.
+        """
+        if self.before_cutoff(date):
+            return True
+        trans_date = as_datetime(trans_date)
+        return trans_date == self.trans_date and transaction_id in self.ids
+
+    def frame_loaded(self, dates, trans_dates, ids):
+        """
+        Vectorised is_loaded.
+        :return: boolean Series.
+        """
+        dates = pd.to_datetime(dates.astype(str).str.replace('/', '-'), format='ISO8601')
+        trans_dates = pd.to_datetime(trans_dates.astype(str).str.replace('/', '-'), format='ISO8601')
+        return (dates < self.cutoff) | ((trans_dates == self.trans_date) & ids.isin(self.ids))
+
+
+def load_watermark(backend, account):
+    """
+    :param backend: storage backend (see transaction_classifier.storage).
+    :return: the stored Watermark for account, or None.
+    """
+    connection = backend.connect()
+    try:
+        cursor = connection.cursor()
+        cursor.execute(WATERMARK_TABLE)
+        cursor.execute('SELECT trans_date, ids FROM watermarks WHERE account = {};'.format(backend.placeholder),
+                       (account,))
+        row = cursor.fetchone()
+    finally:
+        connection.close()
+    if row is None or row[0] is None:
+        return None
+    return Watermark(account, row[0], row[1].split(',') if row[1] else [], watermarks().lookback_days)
+
+
+def update_watermark(backend, account):
+    """
+    Recalculate the watermark of account from the transactions table and store it.
+    :return: the new Watermark, or None if the account has no transactions.
+    """
+    p = backend.placeholder
+    connection = backend.connect()
+    try:
+        cursor = connection.cursor()
+        cursor.execute(WATERMARK_TABLE)
+        cursor.execute('SELECT MAX(trans_date) FROM transactions WHERE account = {};'.format(p), (account,))
+        trans_date = cursor.fetchone()[0]
+        if trans_date is None:
+            return None
+        cursor.execute('SELECT id FROM transactions WHERE account = {} AND trans_date = {};'.format(p, p),
+                       (account, trans_date))
+        ids = [row[0] for row in cursor.fetchall()]
+        cursor.execute('REPLACE INTO watermarks (account, trans_date, ids) VALUES ({}, {}, {});'.format(p, p, p),
+                       (account, trans_date, ','.join(ids)))
+        connection.commit()
+    finally:
+        connection.close()
+    watermark = Watermark(account, trans_date, ids, watermarks().lookback_days)
+    logger.info('New watermark {}'.format(watermark))
+    return watermark
@@ -35,3 +35,21 @@ class NabTransactionHistoryPage(be.BasePage):
         self.buttons.date_range_dropdown = be.BaseButton(driver, xpath='//*[@id="input-transaction-period"]/a')
         self.buttons.this_financial_year = be.BaseButton(driver, xpath='//span[text()="This financial year"]')
         self.buttons.last_financial_year = be.BaseButton(driver, xpath='//span[text()="Last financial year"]')
+        self.buttons.custom_date_range = be.BaseButton(driver, xpath='//span[text()="Custom date range"]')
+
+        # custom date range fields (dd/mm/yyyy):
+        self.fields.date_from = be.BaseField(driver, xpath='//input[@id="fromDate"]',
+                                             name='NabTransactionHistoryPage.fields.date_from')
+        self.fields.date_to = be.BaseField(driver, xpath='//input[@id="toDate"]',
+                                           name='NabTransactionHistoryPage.fields.date_to')
+
+    def select_date_range(self, date_from, date_to):
+        """
+        Pick 'Custom date range' in the open date range dropdown and fill in both dates.
+        """
+        self.buttons.custom_date_range.click()
+        sleep(2)
+        for field, date in [(self.fields.date_from, date_from), (self.fields.date_to, date_to)]:
+            field.clear()
+            field.send_keys(date.strftime('%d/%m/%Y'))
+        sleep(1)